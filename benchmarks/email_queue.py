@@ -0,0 +1,133 @@
+"""
+Messages per second of the email outbox worker against a local aiosmtpd
+server, compared with opening a new SMTP session per message as the old
+``BackgroundTasks`` sender did.
+
+Usage::
+
+    python -m benchmarks.email_queue --messages 500 --connections 1 2 4
+
+``--handshake-ms`` delays every new connection on the server side to stand in
+for the TCP/TLS setup and greeting of a remote mail server.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import tempfile
+import time
+
+import aiosmtplib
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import SMTP
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.database.models import Base, EmailMessage
+from src.services.email_worker import EmailWorker, SMTPPool
+
+SENDER = "Contacts <noreply@example.com>"
+
+
+class Sink:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+class SlowGreetingSMTP(SMTP):
+    handshake = 0.0
+
+    async def _handle_client(self):
+        await asyncio.sleep(self.handshake)
+        await super()._handle_client()
+
+
+class SlowController(Controller):
+    def factory(self):
+        return SlowGreetingSMTP(self.handler, **self.SMTP_kwargs)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def enqueue(session_factory, messages: int):
+    async with session_factory() as db:
+        await db.execute(delete(EmailMessage))
+        db.add_all(EmailMessage(recipient=f"user{i}@example.com", subject="Confirm your email ",
+                                template="email_template.html",
+                                context={"host": "http://bench/", "username": f"user{i}", "token": "x" * 160})
+                   for i in range(messages))
+        await db.commit()
+
+
+async def per_message(session_factory, port: int, messages: int) -> float:
+    """
+    Send every message over its own connection, one after another.
+
+    :return: Messages per second.
+    """
+    await enqueue(session_factory, messages)
+    worker = EmailWorker(session_factory, SMTPPool(1), SENDER, batch_size=messages)
+    claimed = await worker.claim()
+    started = time.perf_counter()
+    for message in claimed:
+        await aiosmtplib.send(worker.build(message), hostname="127.0.0.1", port=port,
+                              use_tls=False, start_tls=False)
+    return len(claimed) / (time.perf_counter() - started)
+
+
+async def pooled(session_factory, port: int, messages: int, connections: int, batch_size: int) -> dict:
+    """
+    Drain the outbox with the worker.
+
+    :return: Worker statistics.
+    """
+    await enqueue(session_factory, messages)
+    pool = SMTPPool(connections, hostname="127.0.0.1", port=port, use_tls=False, start_tls=False)
+    worker = EmailWorker(session_factory, pool, SENDER, batch_size=batch_size)
+    try:
+        return await worker.drain()
+    finally:
+        await pool.close()
+
+
+async def run(args):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    SlowGreetingSMTP.handshake = args.handshake_ms / 1000
+    controller = SlowController(Sink(), hostname="127.0.0.1", port=free_port())
+    controller.start()
+    try:
+        rate = await per_message(session_factory, controller.port, args.messages)
+        print(f"{'connection per message':>24} {rate:>10.1f} messages/s")
+        for connections in args.connections:
+            stats = await pooled(session_factory, controller.port, args.messages, connections, args.batch_size)
+            print(f"{f'pool of {connections}':>24} {stats['messages_per_second']:>10.1f} messages/s")
+    finally:
+        controller.stop()
+        await engine.dispose()
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--handshake-ms", type=float, default=20)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Startup cost of the API: how long ``import main`` takes in a fresh interpreter.
+
+Usage::
+
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --runs 10 --budget-ms 1500 --top 30
+
+Every run starts ``python -X importtime -c "import main"`` and parses its
+report. The median total and the modules with the largest own import time
+are printed, the latter also summed per top-level package. The exit code is
+1 when the median goes over ``--budget-ms`` or when one of the ``LAZY``
+modules, which only single endpoints or workers need, was imported.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+# Imported where they are used, never at startup
+LAZY = ("PIL", "cloudinary", "aiosmtplib", "jinja2", "uvicorn", "alembic")
+
+
+def measure(python: str, env: dict) -> dict[str, int]:
+    """
+    Import ``main`` in a new interpreter.
+
+    :return: Own import time in microseconds per module.
+    """
+    result = subprocess.run([python, "-X", "importtime", "-c", "import main"], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return {match[4]: int(match[1]) for match in LINE.finditer(result.stderr)}
+
+
+def report(runs: list[dict[str, int]], top: int) -> float:
+    """
+    Print the median total and the slowest modules and packages.
+
+    :return: Median total in milliseconds.
+    """
+    totals = [sum(run.values()) / 1000 for run in runs]
+    modules = {name: statistics.median(run.get(name, 0) for run in runs) / 1000 for name in runs[0]}
+    packages = defaultdict(float)
+    for name, ms in modules.items():
+        packages[name.split(".")[0]] += ms
+    print(f"import main: median {statistics.median(totals):.1f} ms, min {min(totals):.1f} ms "
+          f"over {len(runs)} runs, {len(modules)} modules")
+    print(f"\n{'package':<40}{'ms':>10}")
+    for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{name:<40}{ms:>10.1f}")
+    print(f"\n{'module (own time)':<40}{'ms':>10}")
+    for name, ms in sorted(modules.items(), key=lambda item: -item[1])[:top]:
+        print(f"{name:<40}{ms:>10.1f}")
+    return statistics.median(totals)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail when the median total is higher")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # warm up: the first run also writes the bytecode caches
+    measure(sys.executable, env)
+    runs = [measure(sys.executable, env) for _ in range(args.runs)]
+    median = report(runs, args.top)
+
+    failed = False
+    eager = sorted(name for name in runs[0] if name.split(".")[0] in LAZY)
+    if eager:
+        print(f"\nimported at startup, should be lazy: {', '.join(eager)}")
+        failed = True
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"\nover budget: {median:.1f} ms > {args.budget_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,98 @@
+"""
+Latency of contact reads during a login storm, with bcrypt on the event loop
+(``inline``) and in the password pool (``thread`` / ``process``).
+
+Usage::
+
+    python -m benchmarks.password_pool --logins 40 --reads 200
+
+The app runs in-process behind httpx's ASGI transport on a temporary SQLite
+database; the numbers show how much a burst of logins delays unrelated reads.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+import httpx  # noqa: E402
+
+from benchmarks.async_db import seed  # noqa: E402
+from main import app  # noqa: E402
+from src.database.db import SessionLocal  # noqa: E402
+from src.database.models import User  # noqa: E402
+from src.services.auth import auth_service  # noqa: E402
+from src.services.passwords import hash_password, password_pool  # noqa: E402
+
+PASSWORD = "secret1"
+
+
+def percentile(values: list, q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+async def run(kind: str, logins: int, reads: int) -> dict:
+    """
+    Fire logins and authenticated contact reads at the same time.
+
+    :param kind: Password pool kind: inline, thread or process.
+    :return: Login and read latency percentiles in milliseconds.
+    """
+    password_pool.shutdown()
+    password_pool.kind = kind
+    token = await auth_service.create_access_token(data={"sub": "bench@example.com"})
+    headers = {"Authorization": f"Bearer {token}"}
+    login_times, read_times = [], []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get("/api/notes/", headers=headers)
+
+        async def login():
+            started = time.perf_counter()
+            response = await client.post("/api/auth/login", data={"username": "bench@example.com",
+                                                                  "password": PASSWORD})
+            response.raise_for_status()
+            login_times.append((time.perf_counter() - started) * 1000)
+
+        async def read():
+            await asyncio.sleep(0.001 * len(read_times))
+            started = time.perf_counter()
+            response = await client.get("/api/notes/", params={"limit": 20}, headers=headers)
+            response.raise_for_status()
+            read_times.append((time.perf_counter() - started) * 1000)
+
+        await asyncio.gather(*(login() for _ in range(logins)), *(read() for _ in range(reads)))
+
+    return {"login_p50": statistics.median(login_times), "read_p50": statistics.median(read_times),
+            "read_p95": percentile(read_times, 95), "read_max": max(read_times)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--kinds", nargs="+", default=["inline", "thread", "process"])
+    args = parser.parse_args()
+
+    try:
+        seed(f"sqlite:///{DB_PATH}", 100)
+        with SessionLocal() as db:
+            db.query(User).update({"password": hash_password(PASSWORD)})
+            db.commit()
+        print(f"{'pool':>8} {'login p50':>10} {'read p50':>9} {'read p95':>9} {'read max':>9}  (ms)")
+        for kind in args.kinds:
+            stats = asyncio.run(run(kind, args.logins, args.reads))
+            print(f"{kind:>8} {stats['login_p50']:>10.1f} {stats['read_p50']:>9.1f} {stats['read_p95']:>9.1f} "
+                  f"{stats['read_max']:>9.1f}")
+    finally:
+        password_pool.shutdown()
+        os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Latency of one rate-limit check with the in-process token bucket and with
+the Redis sliding-window script.
+
+Usage::
+
+    python -m benchmarks.ratelimit --checks 20000
+    python -m benchmarks.ratelimit --redis-url redis://localhost:6379/0
+
+Without ``--redis-url`` the Redis column uses fakeredis (if installed), which
+runs the Lua script in-process: it validates the script but its timing
+excludes the network round trip a real server adds.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from src.services.ratelimit import RateLimiter
+
+LIMITS = {"bench": "1000000/minute"}
+
+
+def percentile(values: list, q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+async def measure(limiter: RateLimiter, checks: int, identities: int) -> dict:
+    """
+    Time sequential checks spread over a number of client identities.
+
+    :return: Latency percentiles in microseconds.
+    """
+    times = []
+    for i in range(checks):
+        started = time.perf_counter()
+        await limiter.hit("bench", f"10.0.{i % identities // 256}.{i % 256}")
+        times.append((time.perf_counter() - started) * 1e6)
+    return {"p50": statistics.median(times), "p99": percentile(times, 99), "mean": statistics.fmean(times)}
+
+
+async def run(args):
+    backends = {"local": None}
+    if args.redis_url:
+        import redis.asyncio as redis
+
+        backends["redis"] = redis.Redis.from_url(args.redis_url)
+    else:
+        try:
+            import fakeredis
+        except ImportError:
+            print("fakeredis is not installed, pass --redis-url to measure Redis")
+        else:
+            backends["fakeredis"] = fakeredis.FakeAsyncRedis()
+
+    print(f"{'backend':>10} {'p50':>8} {'p99':>8} {'mean':>8}  (us per check)")
+    for name, client in backends.items():
+        limiter = RateLimiter(LIMITS, redis=client)
+        await measure(limiter, min(1000, args.checks), args.identities)
+        stats = await measure(limiter, args.checks, args.identities)
+        if limiter.fallback._buckets and client is not None:
+            print(f"{name:>10} unavailable, fell back to local buckets")
+            continue
+        print(f"{name:>10} {stats['p50']:>8.1f} {stats['p99']:>8.1f} {stats['mean']:>8.1f}")
+        if client is not None:
+            await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=20000)
+    parser.add_argument("--identities", type=int, default=1000)
+    parser.add_argument("--redis-url")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
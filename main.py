@@ -1,11 +1,15 @@
-import redis.asyncio as redis
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from fastapi_limiter import FastAPILimiter
-import uvicorn
-from src.routes import contacts, auth
+from src.routes import contacts, auth, users
 from src.conf.config import config
+from src.database.db import async_engine, replica_engines
+from src.services import metrics
+from src.services.cache import user_cache
+from src.services.avatars import image_pool
+from src.services.passwords import password_pool
+from src.services.ratelimit import limiter
+from src.services.read_routing import recent_writes
 
 
 app = FastAPI()
@@ -19,19 +23,59 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_pool(async_engine.sync_engine, "api")
+for number, replica in enumerate(replica_engines):
+    metrics.instrument_pool(replica.sync_engine, f"replica{number}")
 
 app.include_router(auth.router, prefix='/api')
 app.include_router(contacts.router, prefix='/api')
+app.include_router(users.router, prefix='/api')
 
 @app.on_event("startup")
 async def startup():
-    r = await redis.Redis(host=config.redis_host, port=config.redis_port, db=0, encoding="utf-8",
-                          decode_responses=True)
-    await FastAPILimiter.init(r)
+    r = await metrics.InstrumentedRedis(host=config.redis_host, port=config.redis_port, db=0, encoding="utf-8",
+                                        decode_responses=True)
+    limiter.redis = r
+    user_cache.redis = r
+    recent_writes.redis = r
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    password_pool.shutdown()
+    image_pool.shutdown()
 
 @app.get("/")
 def read_root():
     return {"message": "Hello World"}
 
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """
+    Request, database, pool and Redis metrics of this worker in the Prometheus text format.
+    """
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+
+@app.get("/api/stats/user_cache")
+def read_user_cache_stats():
+    """
+    Hit and miss counters of the authenticated user cache in this worker.
+    """
+    return user_cache.stats()
+
+
+@app.get("/api/stats/password_pool")
+def read_password_pool_stats():
+    """
+    Load of the password hashing pool in this worker.
+    """
+    return password_pool.stats()
+
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000)
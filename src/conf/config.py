@@ -3,23 +3,62 @@ from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
-    DB_URL: str
-    SECRET_KEY_JWT: str
-    ALGORITHM: str
-    MAIL_USERNAME: str
-    MAIL_PASSWORD: str
-    MAIL_FROM: str
-    MAIL_PORT: int
-    MAIL_SERVER: str
-    REDIS_DOMAIN: str = 'localhost'
-    REDIS_PORT: int = 6379
-    REDIS_PASSWORD: str
-    CLOUDINARY_NAME=cloud_name
-    CLOUDINARY_API_KEY=12345678
-    CLOUDINARY_API_SECRET=api_secret
+    sqlalchemy_database_url: str = "sqlite:///./sql_app.db"
+    # read replicas of the primary, e.g. SQLALCHEMY_REPLICA_URLS='["postgresql+psycopg2://...@replica1/db"]'
+    sqlalchemy_replica_urls: list[str] = []
+    # after a write, the user's reads go to the primary for this long
+    read_your_writes_seconds: float = 5
+    secret_key: str = "secret_key"
+    algorithm: str = "HS256"
+    mail_username: str = "example@meta.ua"
+    mail_password: str = "password"
+    mail_from: str = "example@meta.ua"
+    mail_port: int = 465
+    mail_server: str = "smtp.meta.ua"
+    mail_from_name: str = "Desired Name"
+    mail_starttls: bool = False
+    mail_ssl_tls: bool = True
+    mail_use_credentials: bool = True
+    email_smtp_connections: int = 2
+    email_batch_size: int = 50
+    email_max_attempts: int = 5
+    email_retry_delay: float = 30
+    email_poll_interval: float = 1
+    redis_host: str = 'localhost'
+    redis_port: int = 6379
+    redis_password: str | None = None
+    cloudinary_name: str = "cloud_name"
+    cloudinary_api_key: str = "12345678"
+    cloudinary_api_secret: str = "api_secret"
+    avatar_storage: str = "local"
+    avatar_dir: str = "./avatars"
+    avatar_max_bytes: int = 5 * 1024 * 1024
+    avatar_sizes: list[int] = [64, 128, 250]
+    avatar_workers: int = 2
+    gravatar_cache_size: int = 10000
+    gravatar_cache_ttl: float = 86400
+    slow_query_ms: float = 100
+    explain_slow_queries: bool = True
+    n_plus_one_threshold: int = 5
+    query_budget_strict: bool = False
+    duplicates_threshold: float = 0.5
+    duplicates_max_block: int = 100
+    duplicates_sync_limit: int = 5000
+    # country calling code of numbers written in national form, e.g. 050 111 22 33
+    phone_country_code: str = "380"
+    # Postgres only: hash-partition contacts by user_id into this many partitions, 0 for a plain table
+    contacts_partitions: int = 0
+    rate_limits: dict[str, str] = {"signup": "5/minute", "login": "10/minute", "refresh_token": "20/minute",
+                                   "request_email": "3/10 minutes"}
+    user_cache_size: int = 1024
+    user_cache_ttl: float = 60
+    user_cache_redis_ttl: int = 900
+    jwt_cache_size: int = 4096
+    password_hash_executor: str = "thread"
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 64
 
-
-    model_config = ConfigDict(env_file = ".env", env_file_encoding = "utf-8")
+    model_config = ConfigDict(extra="ignore", env_file=".env", env_file_encoding="utf-8")
 
 
 config = Settings()
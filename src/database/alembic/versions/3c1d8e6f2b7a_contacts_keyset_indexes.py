@@ -0,0 +1,59 @@
+"""Contacts owner and keyset pagination indexes
+
+Revision ID: 3c1d8e6f2b7a
+Revises: a5b959ee0440
+Create Date: 2026-10-18 10:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1d8e6f2b7a'
+down_revision: Union[str, None] = 'a5b959ee0440'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+KEYSET_INDEXES = {
+    'ix_contacts_user_id_id': ['user_id', 'id'],
+    'ix_contacts_user_id_name': ['user_id', 'last_name', 'first_name', 'id'],
+    'ix_contacts_user_id_birthday': ['user_id', 'birthday', 'id'],
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # users and contacts.user_id may already exist in databases built by create_all
+    if not inspector.has_table('users'):
+        op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=True),
+        sa.Column('email', sa.String(length=250), nullable=False),
+        sa.Column('password', sa.String(length=255), nullable=False),
+        sa.Column('crated_at', sa.DateTime(), nullable=True),
+        sa.Column('avatar', sa.String(length=255), nullable=True),
+        sa.Column('refresh_token', sa.String(length=255), nullable=True),
+        sa.Column('confirmed', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email')
+        )
+    if 'user_id' not in {c['name'] for c in inspector.get_columns('contacts')}:
+        with op.batch_alter_table('contacts') as batch_op:
+            batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_contacts_user_id_users', 'users', ['user_id'], ['id'],
+                                        ondelete='CASCADE')
+    existing = {index['name'] for index in inspector.get_indexes('contacts')}
+    for name, columns in KEYSET_INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'contacts', columns, unique=False)
+
+
+def downgrade() -> None:
+    for name in reversed(list(KEYSET_INDEXES)):
+        op.drop_index(name, table_name='contacts')
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.drop_constraint('fk_contacts_user_id_users', type_='foreignkey')
+        batch_op.drop_column('user_id')
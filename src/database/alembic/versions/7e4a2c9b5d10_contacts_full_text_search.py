@@ -0,0 +1,43 @@
+"""Contacts full-text search index
+
+Revision ID: 7e4a2c9b5d10
+Revises: 3c1d8e6f2b7a
+Create Date: 2026-10-18 11:03:17.284590
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database import fts
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e4a2c9b5d10'
+down_revision: Union[str, None] = '3c1d8e6f2b7a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in fts.SQLITE_CREATE:
+            op.execute(statement)
+        # index the rows that existed before the triggers
+        op.execute(fts.SQLITE_REBUILD)
+    elif dialect == 'postgresql':
+        # the generated column is computed for existing rows on creation
+        for statement in fts.POSTGRES_CREATE:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in fts.SQLITE_DROP:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        for statement in fts.POSTGRES_DROP:
+            op.execute(statement)
@@ -0,0 +1,47 @@
+"""Contacts birthday key for upcoming birthdays
+
+Revision ID: 9b2f6d1e8c34
+Revises: 7e4a2c9b5d10
+Create Date: 2026-10-18 12:26:54.917402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database import fts
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b2f6d1e8c34'
+down_revision: Union[str, None] = '7e4a2c9b5d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL = {
+    'sqlite': "UPDATE contacts SET birthday_key = CAST(strftime('%m%d', birthday) AS INTEGER) "
+              "WHERE birthday IS NOT NULL",
+    'postgresql': "UPDATE contacts SET birthday_key = EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday) "
+                  "WHERE birthday IS NOT NULL",
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'birthday_key' not in {c['name'] for c in inspector.get_columns('contacts')}:
+        op.add_column('contacts', sa.Column('birthday_key', sa.SmallInteger(), nullable=True))
+    if 'ix_contacts_user_id_birthday_key' not in {index['name'] for index in inspector.get_indexes('contacts')}:
+        op.create_index('ix_contacts_user_id_birthday_key', 'contacts', ['user_id', 'birthday_key'], unique=False)
+    op.execute(BACKFILL[bind.dialect.name])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_key', table_name='contacts')
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.drop_column('birthday_key')
+    if op.get_bind().dialect.name == 'sqlite':
+        # recreating the table in batch mode drops the full-text search triggers
+        for statement in fts.SQLITE_CREATE:
+            op.execute(statement)
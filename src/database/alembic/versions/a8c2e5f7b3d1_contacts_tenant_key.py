@@ -0,0 +1,51 @@
+"""Contacts tenant key: non-null user_id, emails unique per user
+
+Revision ID: a8c2e5f7b3d1
+Revises: f3b7d9a1c5e2
+Create Date: 2026-10-18 18:37:12.604183
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database import fts
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c2e5f7b3d1'
+down_revision: Union[str, None] = 'f3b7d9a1c5e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def set_user_id_nullable(nullable: bool) -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        with op.batch_alter_table('contacts') as batch_op:
+            batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=nullable)
+        # recreating the table in batch mode drops the full-text search triggers
+        for statement in fts.SQLITE_CREATE:
+            op.execute(statement)
+    else:
+        op.alter_column('contacts', 'user_id', existing_type=sa.Integer(), nullable=nullable)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    orphans = bind.execute(sa.text('SELECT count(*) FROM contacts WHERE user_id IS NULL')).scalar_one()
+    if orphans:
+        raise RuntimeError(f"{orphans} contacts have no user_id; assign or delete them before upgrading")
+    indexes = {index['name'] for index in sa.inspect(bind).get_indexes('contacts')}
+    if 'ix_contacts_email' in indexes:
+        op.drop_index('ix_contacts_email', table_name='contacts')
+    if 'ix_contacts_user_id_email' not in indexes:
+        op.create_index('ix_contacts_user_id_email', 'contacts', ['user_id', 'email'], unique=True)
+    set_user_id_nullable(False)
+
+
+def downgrade() -> None:
+    set_user_id_nullable(True)
+    op.drop_index('ix_contacts_user_id_email', table_name='contacts')
+    op.create_index('ix_contacts_email', 'contacts', ['email'], unique=True)
@@ -0,0 +1,42 @@
+"""Optional hash partitioning of contacts by user_id on Postgres
+
+Revision ID: b4f6a2d8c9e3
+Revises: a8c2e5f7b3d1
+Create Date: 2026-10-18 18:52:40.118357
+
+Applies only on Postgres with ``contacts_partitions`` set; elsewhere it is a
+no-op. To partition an already migrated database later, set the option and
+run ``alembic downgrade a8c2e5f7b3d1`` then ``alembic upgrade head``.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.conf.config import config
+from src.database import partitioning
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4f6a2d8c9e3'
+down_revision: Union[str, None] = 'a8c2e5f7b3d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def is_partitioned(bind) -> bool:
+    return bind.dialect.name == 'postgresql' and bind.execute(sa.text(partitioning.IS_PARTITIONED)).scalar_one()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql' and config.contacts_partitions and not is_partitioned(bind):
+        for statement in partitioning.rebuild(config.contacts_partitions):
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    if is_partitioned(op.get_bind()):
+        for statement in partitioning.rebuild():
+            op.execute(statement)
@@ -0,0 +1,39 @@
+"""Contact and contact list versions for ETags
+
+Revision ID: d7f3b2a9e1c5
+Revises: c4e8a1f3d6b2
+Create Date: 2026-10-18 15:20:07.614482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database import fts
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f3b2a9e1c5'
+down_revision: Union[str, None] = 'c4e8a1f3d6b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if 'version' not in {c['name'] for c in inspector.get_columns('contacts')}:
+        op.add_column('contacts', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    if 'contacts_version' not in {c['name'] for c in inspector.get_columns('users')}:
+        op.add_column('users', sa.Column('contacts_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('contacts_version')
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.drop_column('version')
+    if op.get_bind().dialect.name == 'sqlite':
+        # recreating the table in batch mode drops the full-text search triggers
+        for statement in fts.SQLITE_CREATE:
+            op.execute(statement)
@@ -0,0 +1,62 @@
+"""Contacts phone number in E.164 form for lookups by number
+
+Revision ID: f3b7d9a1c5e2
+Revises: e2a6c8d4f1b9
+Create Date: 2026-10-18 18:04:37.519826
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database import fts
+from src.database.models import normalize_phone
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b7d9a1c5e2'
+down_revision: Union[str, None] = 'e2a6c8d4f1b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+contacts = sa.table('contacts', sa.column('id', sa.Integer), sa.column('phone_number', sa.String),
+                    sa.column('phone_e164', sa.String))
+
+
+def backfill(bind) -> None:
+    # normalization is not expressible in portable SQL, so rows are read and updated in batches
+    stmt = sa.update(contacts).where(contacts.c.id == sa.bindparam('row_id')).values(phone_e164=sa.bindparam('key'))
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.select(contacts.c.id, contacts.c.phone_number)
+                            .where(contacts.c.id > last_id, contacts.c.phone_number.is_not(None))
+                            .order_by(contacts.c.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        params = [{'row_id': row.id, 'key': key} for row in rows if (key := normalize_phone(row.phone_number))]
+        if params:
+            bind.execute(stmt, params)
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'phone_e164' not in {c['name'] for c in inspector.get_columns('contacts')}:
+        op.add_column('contacts', sa.Column('phone_e164', sa.String(length=16), nullable=True))
+    if 'ix_contacts_user_id_phone_e164' not in {index['name'] for index in inspector.get_indexes('contacts')}:
+        op.create_index('ix_contacts_user_id_phone_e164', 'contacts', ['user_id', 'phone_e164'], unique=False)
+    backfill(bind)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_phone_e164', table_name='contacts')
+    with op.batch_alter_table('contacts') as batch_op:
+        batch_op.drop_column('phone_e164')
+    if op.get_bind().dialect.name == 'sqlite':
+        # recreating the table in batch mode drops the full-text search triggers
+        for statement in fts.SQLITE_CREATE:
+            op.execute(statement)
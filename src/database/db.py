@@ -1,16 +1,173 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_database_url
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+from src.conf.config import config
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Convert a synchronous database URL to the matching async driver URL.
+
+    :param url: Database URL, e.g. ``postgresql+psycopg2://...`` or ``sqlite:///...``.
+    :return: The same URL with an async driver (asyncpg or aiosqlite).
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}'")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def connect_args_for(url: str) -> dict:
+    """
+    Driver specific connection arguments for the given URL.
+
+    :param url: Database URL.
+    :return: Keyword arguments for the DBAPI ``connect`` call.
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"check_same_thread": False}
+    return {}
+
+
+logger = logging.getLogger(__name__)
 
+EXPLAIN_PREFIXES = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+
+
+class QueryStats:
+    """
+    Statements executed while handling one request.
+
+    ``shapes`` counts executions per SQL text; the text carries placeholders,
+    not values, so the same query run for every row of a result (N+1) shows
+    up as one shape with a high count.
+    """
+    __slots__ = ("count", "seconds", "shapes", "repeated")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self.repeated = []
+
+
+# Set by the request middleware; the cursor hooks below add to it
+request_queries: ContextVar[QueryStats | None] = ContextVar("request_queries", default=None)
+
+
+def explain(conn, statement: str, parameters) -> str | None:
+    """
+    Query plan of a read statement, on the connection that ran it.
+
+    :param conn: Connection the statement ran on.
+    :param statement: SQL text with placeholders.
+    :param parameters: Parameters of the statement.
+    :return: Plan, one step per line, or None for other statements and dialects.
+    """
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def describe_parameters(parameters, executemany: bool) -> str:
+    """
+    Shape of a statement's parameters for the log, without their values.
+
+    Values may be tokens, password hashes or personal data, so only names
+    (for named parameters) and types are shown.
+
+    :param parameters: Parameters passed to the cursor.
+    :param executemany: Whether ``parameters`` is a list of parameter sets.
+    :return: E.g. ``(int, str)``, ``{email: str}`` or ``1000 sets of (int,)``.
+    """
+    if executemany:
+        if not parameters:
+            return "none"
+        return f"{len(parameters)} sets of {describe_parameters(parameters[0], False)}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: {type(value).__name__}" for name, value in parameters.items()) + "}"
+    types = [type(value).__name__ for value in parameters or ()]
+    return f"({', '.join(types)}{',' if len(types) == 1 else ''})"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context.query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def record_query(conn, cursor, statement, parameters, context, executemany):
+    context.query_seconds = elapsed = time.perf_counter() - context.query_started
+    stats = request_queries.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.shapes[statement] += 1
+        if stats.shapes[statement] == config.n_plus_one_threshold:
+            stats.repeated.append(statement)
+            logger.warning("Possible N+1: the same statement ran %s times in one request: %s",
+                           config.n_plus_one_threshold, statement)
+    if elapsed * 1000 >= config.slow_query_ms:
+        plan = None
+        if config.explain_slow_queries and not executemany:
+            try:
+                plan = explain(conn, statement, parameters)
+            except Exception as err:
+                plan = f"EXPLAIN failed: {err}"
+        logger.warning("Slow query (%.1f ms): %s\nparameters: %.1000s%s", elapsed * 1000, statement,
+                       describe_parameters(parameters, executemany), f"\nplan:\n{plan}" if plan else "")
+
+
+SQLALCHEMY_DATABASE_URL = config.sqlalchemy_database_url
+ASYNC_SQLALCHEMY_DATABASE_URL = to_async_url(SQLALCHEMY_DATABASE_URL)
+
+# Synchronous engine, used by Alembic and command line scripts
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args_for(SQLALCHEMY_DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Asynchronous engine, used by the API so queries never block the event loop
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL,
+                                   connect_args=connect_args_for(SQLALCHEMY_DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Read replicas of the primary, used by read-only routes through get_read_db
+replica_engines = [create_async_engine(to_async_url(url), connect_args=connect_args_for(url))
+                   for url in config.sqlalchemy_replica_urls]
+ReplicaSessionLocals = [async_sessionmaker(replica, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+                        for replica in replica_engines]
+_replica_turn = itertools.count()
+
+
+def replica_session() -> AsyncSession:
+    """
+    Session on the next read replica, round robin.
+
+    :return: New session; there must be at least one replica.
+    """
+    return ReplicaSessionLocals[next(_replica_turn) % len(ReplicaSessionLocals)]()
+
 
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
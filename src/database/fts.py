@@ -0,0 +1,48 @@
+"""
+DDL of the contact full-text search index.
+
+SQLite uses an external content FTS5 table kept in sync by triggers, with
+prefix indexes so short prefix queries do not expand every matching token.
+Postgres uses a generated ``tsvector`` column with a GIN index. The same
+statements are applied by the Alembic migration and by ``create_all``.
+"""
+
+SEARCH_COLUMNS = ("first_name", "last_name", "email", "phone_number", "additional_data")
+
+_columns = ", ".join(SEARCH_COLUMNS)
+_new = ", ".join(f"new.{name}" for name in SEARCH_COLUMNS)
+_old = ", ".join(f"old.{name}" for name in SEARCH_COLUMNS)
+
+SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5({_columns}, "
+    f"content='contacts', content_rowid='id', tokenize='unicode61', prefix='2 3 4')",
+    f"CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(rowid, {_columns}) VALUES (new.id, {_new}); END",
+    f"CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(contacts_fts, rowid, {_columns}) VALUES ('delete', old.id, {_old}); END",
+    f"CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE ON contacts BEGIN "
+    f"INSERT INTO contacts_fts(contacts_fts, rowid, {_columns}) VALUES ('delete', old.id, {_old}); "
+    f"INSERT INTO contacts_fts(rowid, {_columns}) VALUES (new.id, {_new}); END",
+]
+
+SQLITE_REBUILD = "INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')"
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS contacts_fts_au",
+    "DROP TRIGGER IF EXISTS contacts_fts_ad",
+    "DROP TRIGGER IF EXISTS contacts_fts_ai",
+    "DROP TABLE IF EXISTS contacts_fts",
+]
+
+_document = " || ' ' || ".join(f"coalesce({name}, '')" for name in SEARCH_COLUMNS)
+
+POSTGRES_CREATE = [
+    f"ALTER TABLE contacts ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('simple', {_document})) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_contacts_search_vector ON contacts USING gin (search_vector)",
+]
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS ix_contacts_search_vector",
+    "ALTER TABLE contacts DROP COLUMN IF EXISTS search_vector",
+]
@@ -1,20 +1,99 @@
-from sqlalchemy import Column, Integer, String, Date, func, Boolean
+import re
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, SmallInteger, String, Date, func, Boolean, ForeignKey, Index, DDL, event, JSON
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql.sqltypes import DateTime
-from src.database.db import engine
+from src.conf.config import config
+from src.database import fts
 
 Base = declarative_base()
 
+
+def birthday_key(birthday):
+    """
+    Month-day key of a birthday, ``month * 100 + day``, comparable across years.
+
+    :param birthday: Date of birth or None.
+    :return: Key such as 1231 for December 31, or None.
+    """
+    return birthday.month * 100 + birthday.day if birthday is not None else None
+
+
+def normalize_phone(phone, country_code=None):
+    """
+    Phone number in E.164 form, ``+`` and up to 15 digits, ``050 111-22-33`` becomes ``+380501112233``.
+
+    Formatting is dropped; a leading ``00`` is read as the international
+    prefix and a single leading ``0`` as the trunk prefix of a national number.
+
+    :param phone: Phone number as entered or None.
+    :param country_code: Calling code of national numbers, ``phone_country_code`` by default.
+    :return: Normalized number, or None if it cannot be one.
+    """
+    digits = re.sub(r"\D", "", phone or "")
+    if not (phone or "").lstrip().startswith("+"):
+        if digits.startswith("00"):
+            digits = digits[2:]
+        elif digits.startswith("0"):
+            digits = (country_code or config.phone_country_code) + digits[1:]
+    if not 8 <= len(digits) <= 15 or digits.startswith("0"):
+        return None
+    return f"+{digits}"
+
+
 class Contact(Base):
     __tablename__ = "contacts"
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String)
     last_name = Column(String)
-    email = Column(String, unique=True, index=True)
+    email = Column(String)
     phone_number = Column(String)
     birthday = Column(Date)
     additional_data = Column(String, nullable=True)
+    # month * 100 + day of the birthday, kept in sync with birthday for range scans
+    birthday_key = Column(SmallInteger, nullable=True)
+    # phone_number in E.164 form, kept in sync with it for lookups by number
+    phone_e164 = Column(String(16), nullable=True)
+    # bumped on every update, part of the contact's ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # tenant key: every query filters by it, and on Postgres it can hash-partition the table
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user = relationship("User", backref="contacts")
+
+    # Composite indexes backing the keyset sort orders of GET /api/notes/
+    __table_args__ = (
+        Index("ix_contacts_user_id_id", "user_id", "id"),
+        Index("ix_contacts_user_id_name", "user_id", "last_name", "first_name", "id"),
+        Index("ix_contacts_user_id_birthday", "user_id", "birthday", "id"),
+        Index("ix_contacts_user_id_birthday_key", "user_id", "birthday_key"),
+        Index("ix_contacts_user_id_phone_e164", "user_id", "phone_e164"),
+        # emails are unique within one user's address book only
+        Index("ix_contacts_user_id_email", "user_id", "email", unique=True),
+    )
+    # ORM updates, deletes and refreshes filter by the tenant key too, so they touch one partition
+    __mapper_args__ = {"primary_key": [user_id, id]}
+
+    @validates("birthday")
+    def validate_birthday(self, key, value):
+        self.birthday_key = birthday_key(value)
+        return value
+
+    @validates("phone_number")
+    def validate_phone_number(self, key, value):
+        self.phone_e164 = normalize_phone(value)
+        return value
+
+
+# Full-text search index for create_all; production databases get it from Alembic
+for statement in fts.SQLITE_CREATE:
+    event.listen(Contact.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in fts.POSTGRES_CREATE:
+    event.listen(Contact.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in fts.SQLITE_DROP:
+    event.listen(Contact.__table__, "before_drop", DDL(statement).execute_if(dialect="sqlite"))
 
 
 class User(Base):
@@ -27,5 +106,43 @@ class User(Base):
     avatar = Column(String(255), nullable=True)
     refresh_token = Column(String(255), nullable=True)
     confirmed = Column(Boolean, default=False)
+    # bumped by every change to the user's contacts, part of the contact list ETag
+    contacts_version = Column(Integer, nullable=False, default=0, server_default="0")
+
 
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+class EmailMessage(Base):
+    __tablename__ = "email_outbox"
+    id = Column(Integer, primary_key=True)
+    recipient = Column(String(250), nullable=False)
+    subject = Column(String(255), nullable=False)
+    template = Column(String(100), nullable=False)
+    context = Column(JSON, nullable=False)
+    # pending until delivered (sent) or out of attempts (failed)
+    status = Column(String(10), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String(500), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    # The worker polls for due pending messages
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+class ContactJob(Base):
+    __tablename__ = "contact_jobs"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String(20), nullable=False)
+    # pending, running, done or failed
+    status = Column(String(10), nullable=False, default="pending")
+    # progress: units of work done out of total, 0 of 0 until the total is known
+    total = Column(Integer, nullable=False, default=0)
+    done = Column(Integer, nullable=False, default=0)
+    params = Column(JSON, nullable=False, default=dict)
+    result = Column(JSON, nullable=True)
+    error = Column(String(500), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,63 @@
+"""
+DDL of the optional Postgres hash partitioning of ``contacts`` by ``user_id``.
+
+Every contact query filters by ``user_id``, so Postgres prunes it to the one
+partition holding that user; a large address book only grows its own
+partition and its indexes. A partitioned table needs the partition key in
+its primary key and unique indexes, hence ``(user_id, id)`` and
+``(user_id, email)``.
+
+The table is rebuilt rather than altered: the old one is renamed, a new one
+is created ``LIKE`` it, rows are copied and the indexes recreated under
+their usual names. The same statements turn it back into a plain table.
+"""
+from src.database import fts
+
+# Every column of the model; search_vector is generated and not copied
+COLUMNS = ("id", "first_name", "last_name", "email", "phone_number", "birthday", "additional_data", "birthday_key",
+           "phone_e164", "version", "user_id")
+
+INDEXES = [
+    "CREATE INDEX ix_contacts_id ON contacts (id)",
+    "CREATE INDEX ix_contacts_user_id_id ON contacts (user_id, id)",
+    "CREATE INDEX ix_contacts_user_id_name ON contacts (user_id, last_name, first_name, id)",
+    "CREATE INDEX ix_contacts_user_id_birthday ON contacts (user_id, birthday, id)",
+    "CREATE INDEX ix_contacts_user_id_birthday_key ON contacts (user_id, birthday_key)",
+    "CREATE INDEX ix_contacts_user_id_phone_e164 ON contacts (user_id, phone_e164)",
+    "CREATE UNIQUE INDEX ix_contacts_user_id_email ON contacts (user_id, email)",
+]
+
+IS_PARTITIONED = ("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+                  "WHERE c.relname = 'contacts' AND c.relnamespace = current_schema()::regnamespace)")
+
+
+def rebuild(partitions: int = 0) -> list[str]:
+    """
+    Statements rebuilding ``contacts`` with or without hash partitioning.
+
+    :param partitions: Number of hash partitions by ``user_id``; 0 for a plain table.
+    :return: SQL statements to run in one transaction.
+    """
+    columns = ", ".join(COLUMNS)
+    statements = [
+        # the id sequence would be dropped with the old table
+        "ALTER SEQUENCE contacts_id_seq OWNED BY NONE",
+        "ALTER TABLE contacts RENAME TO contacts_old",
+        "ALTER TABLE contacts_old RENAME CONSTRAINT contacts_pkey TO contacts_old_pkey",
+        "CREATE TABLE contacts (LIKE contacts_old INCLUDING DEFAULTS INCLUDING GENERATED)"
+        + (" PARTITION BY HASH (user_id)" if partitions else ""),
+        "ALTER TABLE contacts ADD CONSTRAINT contacts_pkey PRIMARY KEY " + ("(user_id, id)" if partitions else "(id)"),
+        "ALTER TABLE contacts ADD CONSTRAINT fk_contacts_user_id_users FOREIGN KEY (user_id) "
+        "REFERENCES users (id) ON DELETE CASCADE",
+    ]
+    statements += [f"CREATE TABLE contacts_p{remainder} PARTITION OF contacts "
+                   f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})" for remainder in range(partitions)]
+    statements += [
+        f"INSERT INTO contacts ({columns}) SELECT {columns} FROM contacts_old",
+        "DROP TABLE contacts_old",
+        "ALTER SEQUENCE contacts_id_seq OWNED BY contacts.id",
+        *INDEXES,
+        *fts.POSTGRES_CREATE,
+        "ANALYZE contacts",
+    ]
+    return statements
@@ -0,0 +1,75 @@
+"""
+Creates or migrates the database schema. Nothing does this at import time.
+
+Usage::
+
+    python -m src.database.schema upgrade   # apply pending Alembic migrations
+    python -m src.database.schema create    # empty database: create all tables and stamp the Alembic head
+
+``create`` is quicker than replaying every migration and suits development
+and throwaway databases; later migrations apply on top of the stamped head.
+On Postgres with ``contacts_partitions`` set it partitions ``contacts`` the
+way the migrations do.
+"""
+import argparse
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from src.conf.config import config
+from src.database import partitioning
+from src.database.models import Base
+
+ALEMBIC_INI = Path(__file__).with_name("alembic.ini")
+
+
+def alembic_config() -> Config:
+    """
+    Alembic configuration of the project; ``env.py`` points it at the configured database.
+
+    :return: Alembic Config object.
+    """
+    return Config(str(ALEMBIC_INI))
+
+
+def create_schema(engine: Engine):
+    """
+    Create every table, index and trigger of the models on an empty database
+    and mark it as migrated to the latest revision.
+
+    :param engine: Synchronous engine of the database.
+    :raises RuntimeError: The database already has tables.
+    """
+    tables = inspect(engine).get_table_names()
+    if tables:
+        raise RuntimeError(f"Database is not empty ({', '.join(sorted(tables))}), run 'upgrade' instead")
+    Base.metadata.create_all(bind=engine)
+    if engine.dialect.name == "postgresql" and config.contacts_partitions:
+        with engine.begin() as conn:
+            for statement in partitioning.rebuild(config.contacts_partitions):
+                conn.exec_driver_sql(statement)
+    command.stamp(alembic_config(), "head")
+
+
+def upgrade_schema():
+    """
+    Apply pending Alembic migrations.
+    """
+    command.upgrade(alembic_config(), "head")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=["create", "upgrade"])
+    if parser.parse_args().action == "create":
+        from src.database.db import engine
+
+        try:
+            create_schema(engine)
+        except RuntimeError as err:
+            parser.exit(1, f"{err}\n")
+    else:
+        upgrade_schema()
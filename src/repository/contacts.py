@@ -1,19 +1,242 @@
-from sqlalchemy.orm import Session
-from src.database.models import Contact, User
-from schemas import ContactCreate
+import base64
+import json
+import calendar
+import re
+from collections.abc import Mapping
+from datetime import date, timedelta
+
+from sqlalchemy import select, insert, update, delete, tuple_, func, literal_column, table, column, or_
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
+from src.database.models import Contact, User, birthday_key, normalize_phone
+from src.schemas import BulkSelection, ContactCreate, ContactSort, ContactUpdate, MergeGroup
 from sqlalchemy.sql import and_
 
-async def get_contacts(user: User, db: Session):
+# Columns of contact lists and exports, in output order; the fields of ContactRow
+CONTACT_COLUMNS = (Contact.id, Contact.first_name, Contact.last_name, Contact.email, Contact.phone_number,
+                   Contact.birthday, Contact.additional_data)
+
+# Columns of each sort order; every order ends with Contact.id so it is total and stable
+SORT_KEYS = {
+    ContactSort.id: (Contact.id,),
+    ContactSort.name: (Contact.last_name, Contact.first_name, Contact.id),
+    ContactSort.birthday: (Contact.birthday, Contact.id),
+}
+
+
+def contact_columns(fields: tuple[str, ...] | None, *required) -> list:
+    """
+    Columns to read for a sparse fieldset.
+
+    :param fields: Field names to return, None for every field.
+    :param required: Further columns the query needs, e.g. the sort keys of a page cursor.
+    :return: Columns in ``CONTACT_COLUMNS`` order.
+    """
+    if fields is None:
+        return list(CONTACT_COLUMNS)
+    keys = set(fields) | {column.key for column in required}
+    return [column for column in CONTACT_COLUMNS if column.key in keys]
+
+
+def encode_cursor(contact: Contact | Mapping, sort: ContactSort) -> str:
+    """
+    Build an opaque cursor pointing right after the given contact.
+
+    :param contact: Last contact of the current page, an ORM object or a row mapping.
+    :param sort: Sort order the page was produced with.
+    :return: URL safe cursor string.
+    """
+    if isinstance(contact, Mapping):
+        values = [contact[column.key] for column in SORT_KEYS[sort]]
+    else:
+        values = [getattr(contact, column.key) for column in SORT_KEYS[sort]]
+    payload = json.dumps([sort.value, [v.isoformat() if isinstance(v, date) else v for v in values]])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: ContactSort) -> list:
+    """
+    Decode a cursor produced by :func:`encode_cursor`.
+
+    :param cursor: Cursor string from the client.
+    :param sort: Sort order of the requested page.
+    :return: Sort key values of the last contact of the previous page.
+    :raises ValueError: If the cursor is malformed or was made for another sort order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_name, values = json.loads(base64.urlsafe_b64decode(padded))
+        columns = SORT_KEYS[sort]
+        if sort_name != sort.value or len(values) != len(columns):
+            raise ValueError
+        return [date.fromisoformat(v) if column.type.python_type is date and v is not None else v
+                for column, v in zip(columns, values)]
+    except (TypeError, KeyError, UnicodeDecodeError, json.JSONDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+async def get_contacts(user: User, db: AsyncSession, limit: int = 100, after: str | None = None,
+                       sort: ContactSort = ContactSort.id, fields: tuple[str, ...] | None = None):
+    """
+    Get a page of contacts for a user using keyset pagination.
+
+    The page is read through the ``(user_id, sort key, id)`` index, so deep
+    pages cost the same as the first one. Only ``CONTACT_COLUMNS`` are read,
+    as plain rows without ORM objects; with ``fields`` only those and the sort keys.
+
+    :param user: User object.
+    :param db: Database session object.
+    :param limit: Maximum number of records to retrieve.
+    :param after: Cursor returned with the previous page, None for the first page.
+    :param sort: Sort order of the page.
+    :param fields: Sparse fieldset, None for every field.
+    :return: List of contact row mappings for the given user.
+    :raises ValueError: If the cursor is invalid.
+    """
+    columns = SORT_KEYS[sort]
+    stmt = select(*contact_columns(fields, *columns)).filter(Contact.user_id == user.id)
+    if after is not None:
+        stmt = stmt.filter(tuple_(*columns) > tuple_(*decode_cursor(after, sort)))
+    stmt = stmt.order_by(*columns).limit(limit)
+    result = await db.execute(stmt)
+    return result.mappings().all()
+
+async def stream_contacts(user_id: int, bind: AsyncEngine, batch_size: int = 1000, columns=CONTACT_COLUMNS):
+    """
+    Stream all contacts of a user as plain rows through a server-side cursor.
+
+    The rows are read on a dedicated connection, so the stream outlives the
+    request scoped session, and only one batch is held in memory at a time.
+
+    :param user_id: Identifier of the owner.
+    :param bind: Engine to read from.
+    :param batch_size: Number of rows fetched from the cursor at once.
+    :param columns: Columns to read.
+    :return: Async iterator of row batches, each a list of ``columns`` tuples.
+    """
+    stmt = (select(*columns).filter(Contact.user_id == user_id).order_by(Contact.id)
+            .execution_options(yield_per=batch_size))
+    async with bind.connect() as conn:
+        result = await conn.stream(stmt)
+        async for rows in result.partitions():
+            yield rows
+
+
+def search_terms(q: str) -> list[str]:
+    """
+    Split a search string into word tokens safe to embed in a full-text query.
+
+    :param q: Raw search string from the client.
+    :return: Lower-cased word tokens.
     """
-    Get all contacts for a user.
+    return re.findall(r"\w+", q.lower())
+
+
+async def search_contacts(user: User, db: AsyncSession, q: str, limit: int = 20, offset: int = 0,
+                          fields: tuple[str, ...] | None = None):
+    """
+    Full-text search over the name, email, phone and additional data of a user's contacts.
+
+    Every word of the query must match the beginning of a word in the contact.
+    SQLite uses the ``contacts_fts`` FTS5 table ranked by bm25, Postgres the
+    ``search_vector`` GIN index ranked by ts_rank.
 
     :param user: User object.
     :param db: Database session object.
-    :return: List of contacts for the given user.
+    :param q: Search string.
+    :param limit: Maximum number of records to retrieve.
+    :param offset: Number of ranked records to skip.
+    :param fields: Sparse fieldset, None for every field.
+    :return: List of matching contact row mappings, best match first.
     """
-    return db.query(Contact).filter(Contact.user_id == user.id).all()
+    terms = search_terms(q)
+    if not terms:
+        return []
+    columns = contact_columns(fields)
+    if db.bind.dialect.name == "postgresql":
+        vector = literal_column("contacts.search_vector")
+        query = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        stmt = (select(*columns)
+                .filter(Contact.user_id == user.id, vector.op("@@")(query))
+                .order_by(func.ts_rank(vector, query).desc(), Contact.id))
+    else:
+        contacts_fts = table("contacts_fts", column("rowid"))
+        match = " ".join(f'"{term}"*' for term in terms)
+        stmt = (select(*columns)
+                .join(contacts_fts, contacts_fts.c.rowid == Contact.id)
+                .filter(Contact.user_id == user.id, literal_column("contacts_fts").op("MATCH")(match))
+                .order_by(func.bm25(literal_column("contacts_fts")), Contact.id))
+    result = await db.execute(stmt.limit(limit).offset(offset))
+    return result.mappings().all()
+
+
+def birthday_window(today: date, days: int) -> tuple[int, int]:
+    """
+    Range of birthday keys (``month * 100 + day``) falling within the next days.
+
+    In a non-leap year February 29 birthdays are celebrated on February 28.
 
-async def get_contact_by_id(user: User, db: Session, contact_id: int):
+    :param today: First day of the window.
+    :param days: Length of the window in days after today.
+    :return: First and last key, inclusive; the first is greater when the window crosses New Year.
+    """
+    end = today + timedelta(days=days)
+    start_key = today.month * 100 + today.day
+    end_key = end.month * 100 + end.day
+    if end_key == 228 and not calendar.isleap(end.year):
+        end_key = 229
+    return start_key, end_key
+
+
+async def get_upcoming_birthdays(user: User, db: AsyncSession, days: int = 7, today: date | None = None):
+    """
+    Get contacts whose birthday falls within the next days, soonest first.
+
+    The lookup is a range scan over the ``(user_id, birthday_key)`` index,
+    or two of them when the window crosses New Year.
+
+    :param user: User object.
+    :param db: Database session object.
+    :param days: Length of the window in days after today.
+    :param today: First day of the window, the current date by default.
+    :return: List of contact row mappings; every contact when the window spans a whole year.
+    """
+    start_key, end_key = birthday_window(today or date.today(), days)
+    stmt = select(*CONTACT_COLUMNS).filter(Contact.user_id == user.id)
+    if days >= 365:
+        pass
+    elif start_key <= end_key:
+        stmt = stmt.filter(Contact.birthday_key.between(start_key, end_key))
+    else:
+        stmt = stmt.filter(or_(Contact.birthday_key >= start_key, Contact.birthday_key <= end_key))
+    stmt = stmt.order_by(Contact.birthday_key < start_key, Contact.birthday_key, Contact.id)
+    result = await db.execute(stmt)
+    return result.mappings().all()
+
+
+async def get_contacts_by_phone(user: User, db: AsyncSession, phone: str, fields: tuple[str, ...] | None = None):
+    """
+    Get the contacts with a phone number, however either number is formatted.
+
+    The number is normalized like ``phone_e164`` and looked up with one
+    equality seek on the ``(user_id, phone_e164)`` index.
+
+    :param user: User object.
+    :param db: Database session object.
+    :param phone: Phone number, e.g. of an incoming call.
+    :param fields: Field names to return, None for every field.
+    :return: List of contact row mappings, oldest first.
+    :raises ValueError: If the number cannot be normalized.
+    """
+    key = normalize_phone(phone)
+    if key is None:
+        raise ValueError("Invalid phone number")
+    stmt = (select(*contact_columns(fields)).filter(Contact.user_id == user.id, Contact.phone_e164 == key)
+            .order_by(Contact.id))
+    result = await db.execute(stmt)
+    return result.mappings().all()
+
+
+async def get_contact_by_id(user: User, db: AsyncSession, contact_id: int):
     """
     Get a contact by its identifier for a user.
 
@@ -22,9 +245,69 @@ async def get_contact_by_id(user: User, db: Session, contact_id: int):
     :param contact_id: Identifier of the contact.
     :return: The contact if exists, otherwise None.
     """
-    return db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    result = await db.execute(select(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)))
+    return result.scalar_one_or_none()
+
+async def get_contact_row(user: User, db: AsyncSession, contact_id: int, fields: tuple[str, ...] | None = None):
+    """
+    Get the columns of a sparse fieldset and the version of a contact, without an ORM object.
 
-async def create_contact(body: ContactCreate, user: User, db: Session):
+    :param user: User object.
+    :param db: Database session object.
+    :param contact_id: Identifier of the contact.
+    :param fields: Sparse fieldset, None for every field.
+    :return: Row mapping with the fields and ``version``, or None if the contact does not exist.
+    """
+    stmt = (select(*contact_columns(fields), Contact.version)
+            .filter(and_(Contact.id == contact_id, Contact.user_id == user.id)))
+    result = await db.execute(stmt)
+    return result.mappings().one_or_none()
+
+async def count_contacts(user: User, db: AsyncSession) -> int:
+    """
+    Number of contacts of a user, counted on the ``(user_id, id)`` index.
+
+    :param user: User object.
+    :param db: Database session object.
+    :return: Number of contacts.
+    """
+    result = await db.execute(select(func.count()).select_from(Contact).filter(Contact.user_id == user.id))
+    return result.scalar_one()
+
+async def get_contacts_version(user: User, db: AsyncSession) -> int:
+    """
+    Version of the user's contact list, bumped by every create, update and delete.
+
+    :param user: User object.
+    :param db: Database session object.
+    :return: Current version.
+    """
+    result = await db.execute(select(User.contacts_version).filter(User.id == user.id))
+    return result.scalar_one()
+
+async def get_contact_version(user: User, db: AsyncSession, contact_id: int) -> int | None:
+    """
+    Version of one contact without loading the row into an object.
+
+    :param user: User object.
+    :param db: Database session object.
+    :param contact_id: Identifier of the contact.
+    :return: Current version, or None if the contact does not exist.
+    """
+    result = await db.execute(select(Contact.version).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)))
+    return result.scalar_one_or_none()
+
+async def bump_contacts_version(user: User, db: AsyncSession):
+    """
+    Invalidate the ETags of the user's contact list; called in the transaction of every change.
+
+    :param user: User object.
+    :param db: Database session object.
+    """
+    await db.execute(update(User).filter(User.id == user.id).values(contacts_version=User.contacts_version + 1)
+                     .execution_options(synchronize_session=False))
+
+async def create_contact(body: ContactCreate, user: User, db: AsyncSession):
     """
     Create a new contact for a user.
 
@@ -33,13 +316,35 @@ async def create_contact(body: ContactCreate, user: User, db: Session):
     :param db: Database session object.
     :return: The newly created contact.
     """
-    db_contact = Contact(title=body.title, description=body.description, user=user)
+    db_contact = Contact(**body.model_dump(), user_id=user.id)
     db.add(db_contact)
-    db.commit()
-    db.refresh(db_contact)
+    await bump_contacts_version(user, db)
+    await db.commit()
+    await db.refresh(db_contact)
     return db_contact
 
-async def update_contact(user: User, db: Session, contact_id: int, contact: ContactCreate):
+async def create_contacts(contacts: list[ContactCreate], user: User, db: AsyncSession):
+    """
+    Insert many contacts for a user with one batched INSERT and one commit.
+
+    The statement is executed once with a list of parameter sets, so it is
+    compiled a single time and the driver sends all rows in one call.
+
+    :param contacts: Validated contacts to insert.
+    :param user: User object.
+    :param db: Database session object.
+    :return: Number of inserted contacts.
+    """
+    if not contacts:
+        return 0
+    rows = [{**body.model_dump(), "birthday_key": birthday_key(body.birthday),
+             "phone_e164": normalize_phone(body.phone_number), "user_id": user.id} for body in contacts]
+    await db.execute(insert(Contact.__table__), rows)
+    await bump_contacts_version(user, db)
+    await db.commit()
+    return len(rows)
+
+async def update_contact(user: User, db: AsyncSession, contact_id: int, contact: ContactCreate):
     """
     Update an existing contact for a user.
 
@@ -49,15 +354,78 @@ async def update_contact(user: User, db: Session, contact_id: int, contact: Cont
     :param contact: Schema object for updating the contact.
     :return: The updated contact if exists, otherwise None.
     """
-    db_contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    db_contact = await get_contact_by_id(user, db, contact_id)
     if db_contact:
-        for key, value in contact.dict().items():
+        for key, value in contact.model_dump().items():
             setattr(db_contact, key, value)
-        db.commit()
-        db.refresh(db_contact)
+        db_contact.version = Contact.version + 1
+        await bump_contacts_version(user, db)
+        await db.commit()
+        await db.refresh(db_contact)
     return db_contact
 
-async def delete_contact(user: User, db: Session, contact_id: int):
+def selection_conditions(user: User, selection: BulkSelection) -> list:
+    """
+    WHERE conditions matching the user's contacts picked by a bulk selection.
+
+    :param user: User object.
+    :param selection: Identifiers and/or exact match filter.
+    :return: List of SQL conditions to AND together.
+    """
+    conditions = [Contact.user_id == user.id]
+    if selection.ids is not None:
+        conditions.append(Contact.id.in_(selection.ids))
+    if selection.filter is not None:
+        for key, value in selection.filter.model_dump(exclude_none=True).items():
+            conditions.append(getattr(Contact, key) == value)
+    return conditions
+
+async def update_contacts(user: User, db: AsyncSession, selection: BulkSelection, values: ContactUpdate):
+    """
+    Update many contacts of a user with a single UPDATE statement.
+
+    No ORM objects are loaded; the identifiers of the changed rows come from RETURNING.
+
+    :param user: User object.
+    :param db: Database session object.
+    :param selection: Contacts to update.
+    :param values: Fields to set; unset fields are left untouched.
+    :return: Identifiers of the updated contacts.
+    """
+    changes = values.model_dump(exclude_unset=True)
+    if "birthday" in changes:
+        changes["birthday_key"] = birthday_key(changes["birthday"])
+    if "phone_number" in changes:
+        changes["phone_e164"] = normalize_phone(changes["phone_number"])
+    stmt = (update(Contact).where(*selection_conditions(user, selection))
+            .values(**changes, version=Contact.version + 1)
+            .returning(Contact.id).execution_options(synchronize_session=False))
+    result = await db.execute(stmt)
+    ids = sorted(result.scalars().all())
+    if ids:
+        await bump_contacts_version(user, db)
+    await db.commit()
+    return ids
+
+async def delete_contacts(user: User, db: AsyncSession, selection: BulkSelection):
+    """
+    Delete many contacts of a user with a single DELETE statement.
+
+    :param user: User object.
+    :param db: Database session object.
+    :param selection: Contacts to delete.
+    :return: Identifiers of the deleted contacts.
+    """
+    stmt = (delete(Contact).where(*selection_conditions(user, selection))
+            .returning(Contact.id).execution_options(synchronize_session=False))
+    result = await db.execute(stmt)
+    ids = sorted(result.scalars().all())
+    if ids:
+        await bump_contacts_version(user, db)
+    await db.commit()
+    return ids
+
+async def delete_contact(user: User, db: AsyncSession, contact_id: int):
     """
     Delete a contact for a user.
 
@@ -66,8 +434,71 @@ async def delete_contact(user: User, db: Session, contact_id: int):
     :param contact_id: The identifier of the contact to delete.
     :return: The deleted contact if exists, otherwise None.
     """
-    db_contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    db_contact = await get_contact_by_id(user, db, contact_id)
     if db_contact:
-        db.delete(db_contact)
-        db.commit()
+        await db.delete(db_contact)
+        await bump_contacts_version(user, db)
+        await db.commit()
     return db_contact
+
+
+def merged_values(target: Contact, sources: list[Contact]) -> dict:
+    """
+    Field values of a contact after merging others into it.
+
+    The target keeps its own values; empty fields are taken from the first
+    source that has them and the additional data of all of them is joined.
+
+    :param target: Contact that is kept.
+    :param sources: Contacts merged into it, in priority order.
+    :return: Changed fields and their new values.
+    """
+    values = {}
+    for field in ("first_name", "last_name", "email", "phone_number", "birthday"):
+        if not getattr(target, field):
+            value = next((getattr(source, field) for source in sources if getattr(source, field)), None)
+            if value:
+                values[field] = value
+    notes = []
+    for contact in (target, *sources):
+        if contact.additional_data and contact.additional_data not in notes:
+            notes.append(contact.additional_data)
+    if "\n".join(notes) != (target.additional_data or ""):
+        values["additional_data"] = "\n".join(notes)
+    return values
+
+async def merge_contacts(user: User, db: AsyncSession, groups: list[MergeGroup]):
+    """
+    Merge groups of duplicate contacts in one transaction.
+
+    Every contact in a group's ``ids`` is folded into its ``target_id`` (see
+    :func:`merged_values`) and deleted. Either all groups are merged or none.
+
+    :param user: User object.
+    :param db: Database session object.
+    :param groups: Groups to merge; a contact appears in one group only.
+    :return: Identifiers of the kept and of the deleted contacts.
+    :raises LookupError: If a contact does not exist; nothing is changed.
+    """
+    ids = [contact_id for group in groups for contact_id in (group.target_id, *group.ids)]
+    result = await db.execute(select(Contact).filter(Contact.user_id == user.id, Contact.id.in_(ids)))
+    contacts = {contact.id: contact for contact in result.scalars()}
+    missing = sorted(set(ids) - contacts.keys())
+    if missing:
+        raise LookupError(f"Contacts not found: {', '.join(map(str, missing))}")
+    changes = {group.target_id: merged_values(contacts[group.target_id], [contacts[i] for i in group.ids])
+               for group in groups}
+    deleted = sorted(contact_id for group in groups for contact_id in group.ids)
+    # delete first: a target may take over the unique email of a deleted contact
+    await db.execute(delete(Contact).where(Contact.user_id == user.id, Contact.id.in_(deleted))
+                     .execution_options(synchronize_session=False))
+    for contact_id in deleted:
+        db.expunge(contacts[contact_id])
+    for target_id, values in changes.items():
+        target = contacts[target_id]
+        for field, value in values.items():
+            setattr(target, field, value)
+        target.version = Contact.version + 1
+    await bump_contacts_version(user, db)
+    await db.commit()
+    return [group.target_id for group in groups], deleted
@@ -0,0 +1,33 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import ContactJob, User
+
+
+async def create_job(user: User, kind: str, params: dict, db: AsyncSession) -> ContactJob:
+    """
+    Record a pending background job over a user's contacts.
+
+    :param user: Owner of the contacts.
+    :param kind: What the job does, e.g. ``duplicates``.
+    :param params: JSON serializable parameters for the job runner.
+    :param db: Database session object.
+    :return: The new job.
+    """
+    job = ContactJob(user_id=user.id, kind=kind, params=params, status="pending", total=0, done=0)
+    db.add(job)
+    await db.commit()
+    return job
+
+
+async def get_job(user: User, job_id: int, db: AsyncSession) -> ContactJob | None:
+    """
+    Get a job of a user.
+
+    :param user: Owner of the job.
+    :param job_id: Identifier of the job.
+    :param db: Database session object.
+    :return: The job if it exists, otherwise None.
+    """
+    result = await db.execute(select(ContactJob).filter(ContactJob.id == job_id, ContactJob.user_id == user.id))
+    return result.scalar_one_or_none()
@@ -2,40 +2,54 @@ from typing import List
 
 from fastapi import APIRouter, HTTPException, Depends, status, Security, BackgroundTasks, Request
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
 from src.schemas import UserModel, UserResponse, TokenModel, RequestEmail
 from src.repository import users as repository_users
 from src.services.auth import auth_service
 from src.services.email import send_email
+from src.services.gravatar import resolve_avatars
+from src.services.ratelimit import rate_limit
+from src.services.query_budget import query_budget
 
 router = APIRouter(prefix='/auth', tags=["auth"])
 security = HTTPBearer()
 
 
-@router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(body: UserModel, db: Session = Depends(get_db)):
+@router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(rate_limit("signup")), Depends(query_budget(3))])
+async def signup(body: UserModel, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
     """
     Sign up a new user.
 
+    The Gravatar avatar is resolved in the background after the response.
+
     :param body: User data model object.
+    :param background_tasks: BackgroundTasks object for handling background tasks.
     :param db: Database session object.
     :return: Newly created user object.
     """
     exist_user = await repository_users.get_user_by_email(body.email, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
-    body.password = auth_service.get_password_hash(body.password)
+    # end the read transaction so no connection or lock is held while hashing
+    await db.commit()
+    body.password = await auth_service.get_password_hash(body.password)
     new_user = await repository_users.create_user(body, db)
+    background_tasks.add_task(resolve_avatars, db.bind, [new_user.id])
     return {"user": new_user, "detail": "User successfully created"}
 
 
-@router.post("/login", response_model=TokenModel)
-async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+@router.post("/login", response_model=TokenModel,
+             dependencies=[Depends(rate_limit("login")), Depends(query_budget(2))])
+async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """
     Log in a user and generate access and refresh tokens.
 
+    Users who have not confirmed their email are refused, as test_route_auth
+    has always expected.
+
     :param body: OAuth2PasswordRequestForm object containing user credentials.
     :param db: Database session object.
     :return: Access and refresh tokens.
@@ -43,7 +57,11 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
     user = await repository_users.get_user_by_email(body.username, db)
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
-    if not auth_service.verify_password(body.password, user.password):
+    if not user.confirmed:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed")
+    # end the read transaction so no connection or lock is held while hashing
+    await db.commit()
+    if not await auth_service.verify_password(body.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
     # Generate JWT
     access_token = await auth_service.create_access_token(data={"sub": user.email})
@@ -52,8 +70,9 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
-@router.get('/refresh_token', response_model=TokenModel)
-async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
+@router.get('/refresh_token', response_model=TokenModel,
+             dependencies=[Depends(rate_limit("refresh_token")), Depends(query_budget(2))])
+async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: AsyncSession = Depends(get_db)):
     """
     Refresh the access token using the refresh token.
 
@@ -74,8 +93,8 @@ async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(sec
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
-@router.get('/confirmed_email/{token}')
-async def confirmed_email(token: str, db: Session = Depends(get_db)):
+@router.get('/confirmed_email/{token}', dependencies=[Depends(query_budget(3))])
+async def confirmed_email(token: str, db: AsyncSession = Depends(get_db)):
     """
     Confirm user's email using the confirmation token.
 
@@ -93,22 +112,23 @@ async def confirmed_email(token: str, db: Session = Depends(get_db)):
     return {"message": "Email confirmed"}
 
 
-@router.post('/request_email')
-async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, request: Request,
-                        db: Session = Depends(get_db)):
+@router.post('/request_email',
+             dependencies=[Depends(rate_limit("request_email")), Depends(query_budget(2))])
+async def request_email(body: RequestEmail, request: Request, db: AsyncSession = Depends(get_db)):
     """
     Request email confirmation.
 
+    The email is stored in the outbox before responding and delivered by the mail worker.
+
     :param body: RequestEmail object containing user's email.
-    :param background_tasks: BackgroundTasks object for handling background tasks.
     :param request: Request object containing request details.
     :param db: Database session object.
     :return: Confirmation message.
     """
     user = await repository_users.get_user_by_email(body.email, db)
 
-    if user.confirmed:
+    if user and user.confirmed:
         return {"message": "Your email is already confirmed"}
     if user:
-        background_tasks.add_task(send_email, user.email, user.username, request.base_url)
+        await send_email(user.email, user.username, request.base_url, db)
     return {"message": "Check your email for confirmation."}
@@ -1,80 +1,385 @@
 from typing import List
 
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
+from fastapi import (APIRouter, HTTPException, Depends, status, Query, Header, Response, UploadFile, File, BackgroundTasks,
+                     Request)
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conf.config import config
 from src.database.db import get_db
 from src.database.models import User
-from src.schemas import Contact, ContactCreate
+from src.schemas import (Contact, ContactCreate, ContactSort, ExportFormat, ImportFormat, ImportReport, BulkSelection,
+                         BulkUpdate, BulkResult, ContactJob, DuplicatePair, MergeRequest, MergeResult)
 from src.repository import contacts as repository_contacts
+from src.repository import jobs as repository_jobs
 from src.services.auth import auth_service
+from src.services import duplicates, exporter, importer
+from src.services.etags import etag_matches, make_etag, not_modified, set_etag
+from src.services.query_budget import query_budget
+from src.services.read_routing import get_read_db, get_write_db
+from src.services.serialization import contact_response, contacts_response, parse_fields
 
 router = APIRouter(prefix='/notes', tags=["notes"])
 
 
-@router.get("/", response_model=List[Contact])
-async def read_contacts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+def contact_etag(contact_id: int, version: int, fields: tuple[str, ...] | None = None) -> str:
     """
-    Retrieve all contacts.
+    ETag of a single contact.
 
-    :param skip: Number of records to skip.
+    :param contact_id: Identifier of the contact.
+    :param version: Version of the contact.
+    :param fields: Sparse fieldset of the representation, None for every field.
+    :return: Quoted entity tag.
+    """
+    return make_etag("contact", contact_id, version, *(fields or ()))
+
+
+def contact_fields(fields: str | None = Query(None, description="Comma separated fields to return, "
+                                                                "e.g. first_name,last_name,phone_number; "
+                                                                "id is always included")):
+    """
+    Dependency parsing the sparse fieldset of a contact response.
+
+    :param fields: Raw ``fields`` query parameter.
+    :return: Field names, or None for every field.
+    :raises HTTPException: 400 for unknown field names.
+    """
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/", response_model=List[Contact], dependencies=[Depends(query_budget(3))])
+async def read_contacts(after: str | None = None, limit: int = Query(100, ge=1, le=1000),
+                        sort: ContactSort = ContactSort.id, if_none_match: str | None = Header(None),
+                        fields: tuple[str, ...] | None = Depends(contact_fields), db: AsyncSession = Depends(get_read_db),
+                        current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Retrieve a page of contacts.
+
+    When more contacts may follow, the cursor of the next page is returned in
+    the ``X-Next-Cursor`` header; pass it back as ``after``. The ETag changes
+    with every change to the user's contacts; a matching ``If-None-Match``
+    gets 304 without the contacts being read. With ``fields`` only those
+    columns are read and returned.
+
+    :param after: Cursor of the previous page.
     :param limit: Maximum number of records to retrieve.
+    :param sort: Sort order: id, name (last_name, first_name) or birthday.
+    :param if_none_match: ETag of the page the client already has.
+    :param fields: Sparse fieldset, None for every field.
     :param db: Database session object.
     :param current_user: Current authenticated user.
     :return: List of contacts.
     """
-    contacts = await repository_contacts.get_contacts(skip, limit, db, current_user)
-    return contacts
+    version = await repository_contacts.get_contacts_version(current_user, db)
+    etag = make_etag("contacts", current_user.id, version, sort.value, limit, after, *(fields or ()))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    try:
+        contacts = await repository_contacts.get_contacts(current_user, db, limit, after, sort, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    response = contacts_response(contacts, fields)
+    set_etag(response, etag)
+    if len(contacts) == limit:
+        response.headers["X-Next-Cursor"] = repository_contacts.encode_cursor(contacts[-1], sort)
+    return response
+
+
+@router.get("/search", response_model=List[Contact], dependencies=[Depends(query_budget(2))])
+async def search_contacts(q: str = Query(min_length=1, max_length=200), limit: int = Query(20, ge=1, le=100),
+                          offset: int = Query(0, ge=0, le=1000),
+                          fields: tuple[str, ...] | None = Depends(contact_fields), db: AsyncSession = Depends(get_read_db),
+                          current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Search contacts by name, email, phone number or additional data.
+
+    :param q: Search string; every word must match a word prefix.
+    :param limit: Maximum number of records to retrieve.
+    :param offset: Number of ranked records to skip.
+    :param fields: Sparse fieldset, None for every field.
+    :param db: Database session object.
+    :param current_user: Current authenticated user.
+    :return: List of contacts, best match first.
+    """
+    return contacts_response(await repository_contacts.search_contacts(current_user, db, q, limit, offset, fields),
+                             fields)
+
+
+@router.get("/birthdays", response_model=List[Contact], dependencies=[Depends(query_budget(2))])
+async def read_upcoming_birthdays(days: int = Query(7, ge=0, le=366), db: AsyncSession = Depends(get_read_db),
+                                  current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Retrieve contacts whose birthday falls within the next days.
+
+    :param days: Length of the window in days after today.
+    :param db: Database session object.
+    :param current_user: Current authenticated user.
+    :return: List of contacts, soonest birthday first.
+    """
+    return contacts_response(await repository_contacts.get_upcoming_birthdays(current_user, db, days))
+
+
+@router.get("/by-phone/{number}", response_model=List[Contact], dependencies=[Depends(query_budget(2))])
+async def read_contacts_by_phone(number: str, fields: tuple[str, ...] | None = Depends(contact_fields),
+                                 db: AsyncSession = Depends(get_read_db),
+                                 current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Find contacts by phone number, e.g. the caller of an incoming call.
+
+    The number may be formatted in any way; national numbers starting with 0
+    get the ``phone_country_code``.
+
+    :param number: Phone number to look up.
+    :param fields: Sparse fieldset, None for every field.
+    :param db: Database session object.
+    :param current_user: Current authenticated user.
+    :return: List of contacts with that number.
+    """
+    try:
+        contacts = await repository_contacts.get_contacts_by_phone(current_user, db, number, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return contacts_response(contacts, fields)
+
+
+@router.get("/export", response_class=StreamingResponse, dependencies=[Depends(query_budget(1))])
+async def export_contacts(fmt: ExportFormat = Query(ExportFormat.ndjson, alias="format"), gzip: bool = False,
+                          db: AsyncSession = Depends(get_read_db),
+                          current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Download all contacts as NDJSON or CSV.
+
+    The rows are streamed from a server-side cursor, so memory use does not
+    grow with the size of the address book.
+
+    :param fmt: Output format, ndjson or csv.
+    :param gzip: Compress the file with gzip on the fly.
+    :param db: Database session object.
+    :param current_user: Current authenticated user.
+    :return: Streaming file download.
+    """
+    filename = f"contacts.{fmt.value}" + (".gz" if gzip else "")
+    body = exporter.export_contacts(current_user.id, db.bind, fmt, gzip)
+    return StreamingResponse(body, media_type="application/gzip" if gzip else exporter.MEDIA_TYPES[fmt],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@router.get("/duplicates", response_model=List[DuplicatePair], responses={202: {"model": ContactJob}},
+            dependencies=[Depends(query_budget(3))])
+async def find_duplicates(request: Request, background_tasks: BackgroundTasks,
+                          threshold: float = Query(config.duplicates_threshold, ge=0, le=1),
+                          db: AsyncSession = Depends(get_db),
+                          current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Find pairs of contacts that are likely the same person.
+
+    Contacts are compared only when they share a normalized email, the last
+    digits of a phone number or phonetic name codes. Address books with more
+    than ``duplicates_sync_limit`` contacts are scanned by a background job:
+    the answer is 202 with the job, polled at ``GET /api/notes/jobs/{job_id}``.
+
+    :param request: Request object used to build the job URL.
+    :param background_tasks: BackgroundTasks object running the job.
+    :param threshold: Minimum similarity score of a reported pair.
+    :param db: Database session object.
+    :param current_user: Current authenticated user.
+    :return: Likely duplicates, highest score first, or the started job.
+    """
+    if await repository_contacts.count_contacts(current_user, db) > config.duplicates_sync_limit:
+        job = await repository_jobs.create_job(current_user, "duplicates",
+                                               {"threshold": threshold, "max_block": config.duplicates_max_block}, db)
+        background_tasks.add_task(duplicates.run_duplicates_job, db.bind, job.id)
+        return JSONResponse(ContactJob.model_validate(job).model_dump(mode="json"),
+                            status_code=status.HTTP_202_ACCEPTED,
+                            headers={"Location": str(request.url_for("read_job", job_id=job.id))})
+    rows = await duplicates.load_rows(current_user.id, db.bind)
+    return await duplicates.detect_duplicates(rows, threshold, config.duplicates_max_block)
 
 
-@router.get("/{contact_id}", response_model=Contact)
-async def read_contact(contact_id: int, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+@router.get("/jobs/{job_id}", response_model=ContactJob, dependencies=[Depends(query_budget(2))])
+async def read_job(job_id: int, db: AsyncSession = Depends(get_db),
+                   current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Progress and result of a background job.
+
+    :param job_id: Identifier of the job.
+    :param db: Database session object.
+    :param current_user: Current authenticated user.
+    :return: Job with ``done`` out of ``total`` units of work and, once done, its result.
+    """
+    job = await repository_jobs.get_job(current_user, job_id, db)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.post("/merge", response_model=MergeResult)
+async def merge_contacts(body: MergeRequest, db: AsyncSession = Depends(get_write_db),
+                         current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Merge groups of duplicate contacts in one transaction.
+
+    Each group keeps ``target_id``, fills its empty fields from the other
+    contacts, joins their additional data and deletes them.
+
+    :param body: Groups to merge.
+    :param db: Database session object.
+    :param current_user: Current authenticated user.
+    :return: Identifiers of the kept and of the deleted contacts.
+    """
+    try:
+        merged, deleted = await repository_contacts.merge_contacts(current_user, db, body.groups)
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return MergeResult(merged=merged, deleted=deleted)
+
+
+@router.get("/{contact_id}", response_model=Contact, dependencies=[Depends(query_budget(3))])
+async def read_contact(contact_id: int, response: Response, if_none_match: str | None = Header(None),
+                       fields: tuple[str, ...] | None = Depends(contact_fields),
+                       db: AsyncSession = Depends(get_read_db), current_user: User = Depends(auth_service.get_current_user)):
     """
     Retrieve a contact by its identifier.
 
+    A matching ``If-None-Match`` gets 304 after reading only the contact's
+    version. With ``fields`` only those columns are read, as a plain row.
+
     :param contact_id: Identifier of the contact.
+    :param response: Response object used to set the ETag.
+    :param if_none_match: ETag of the contact the client already has.
+    :param fields: Sparse fieldset, None for every field.
     :param db: Database session object.
     :param current_user: Current authenticated user.
     :return: Contact object.
     """
-    db_contact = await repository_contacts.get_contact_by_id(db, contact_id, current_user)
+    if if_none_match:
+        version = await repository_contacts.get_contact_version(current_user, db, contact_id)
+        if version is not None and etag_matches(if_none_match, contact_etag(contact_id, version, fields)):
+            return not_modified(contact_etag(contact_id, version, fields))
+    if fields is not None:
+        row = await repository_contacts.get_contact_row(current_user, db, contact_id, fields)
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+        result = contact_response(row, fields)
+        set_etag(result, contact_etag(contact_id, row["version"], fields))
+        return result
+    db_contact = await repository_contacts.get_contact_by_id(current_user, db, contact_id)
     if db_contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+    set_etag(response, contact_etag(db_contact.id, db_contact.version))
     return db_contact
 
 
-@router.post("/", response_model=Contact)
-async def create_contact(contact: ContactCreate, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+@router.post("/", response_model=Contact, dependencies=[Depends(query_budget(4))])
+async def create_contact(contact: ContactCreate, response: Response, db: AsyncSession = Depends(get_write_db),
+                         current_user: User = Depends(auth_service.get_current_user)):
     """
     Create a new contact.
 
     :param contact: ContactCreate object containing contact details.
+    :param response: Response object used to set the ETag.
     :param db: Database session object.
     :param current_user: Current authenticated user.
     :return: Newly created contact object.
     """
-    return await repository_contacts.create_contact(db=db, contact=contact, current_user=current_user)
+    try:
+        db_contact = await repository_contacts.create_contact(body=contact, user=current_user, db=db)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Contact with this email already exists")
+    set_etag(response, contact_etag(db_contact.id, db_contact.version))
+    return db_contact
+
+
+@router.post("/import", response_model=ImportReport)
+async def import_contacts(file: UploadFile = File(), fmt: ImportFormat | None = Query(None, alias="format"),
+                          batch_size: int = Query(500, ge=1, le=2000), db: AsyncSession = Depends(get_write_db),
+                          current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Import contacts from an uploaded CSV or JSONL file.
+
+    The file is read row by row and valid rows are inserted in batches, so
+    large address books are imported in one request without loading the
+    whole file into memory.
+
+    :param file: Uploaded CSV (with a header row) or JSONL file.
+    :param fmt: File format; guessed from the file name when omitted.
+    :param batch_size: Number of rows per INSERT statement.
+    :param db: Database session object.
+    :param current_user: Current authenticated user.
+    :return: Import report with per-row errors and throughput.
+    """
+    if fmt is None:
+        is_jsonl = (file.filename or "").lower().endswith((".jsonl", ".ndjson"))
+        fmt = ImportFormat.jsonl if is_jsonl else ImportFormat.csv
+    return await importer.import_contacts(file.file, fmt, current_user, db, batch_size)
+
+
+@router.patch("/bulk", response_model=BulkResult, dependencies=[Depends(query_budget(3))])
+async def update_contacts(body: BulkUpdate, db: AsyncSession = Depends(get_write_db),
+                          current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Update many contacts at once with a single statement.
+
+    :param body: Contacts to update (ids and/or filter) and the values to set.
+    :param db: Database session object.
+    :param current_user: Current authenticated user.
+    :return: Identifiers of the updated contacts.
+    """
+    try:
+        ids = await repository_contacts.update_contacts(current_user, db, body, body.values)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Contact with this email already exists")
+    return {"ids": ids}
+
+
+@router.delete("/bulk", response_model=BulkResult, dependencies=[Depends(query_budget(3))])
+async def delete_contacts(body: BulkSelection, db: AsyncSession = Depends(get_write_db),
+                          current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Delete many contacts at once with a single statement.
+
+    :param body: Contacts to delete (ids and/or filter).
+    :param db: Database session object.
+    :param current_user: Current authenticated user.
+    :return: Identifiers of the deleted contacts.
+    """
+    ids = await repository_contacts.delete_contacts(current_user, db, body)
+    return {"ids": ids}
 
 
-@router.put("/{contact_id}", response_model=Contact)
-async def update_contact(contact_id: int, contact: ContactCreate, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+@router.put("/{contact_id}", response_model=Contact, dependencies=[Depends(query_budget(5))])
+async def update_contact(contact_id: int, contact: ContactCreate, response: Response, db: AsyncSession = Depends(get_write_db),
+                         current_user: User = Depends(auth_service.get_current_user)):
     """
     Update an existing contact.
 
     :param contact_id: Identifier of the contact to update.
     :param contact: ContactCreate object containing updated contact details.
+    :param response: Response object used to set the ETag.
     :param db: Database session object.
     :param current_user: Current authenticated user.
     :return: Updated contact object.
     """
-    db_contact = await repository_contacts.update_contact(db=db, contact_id=contact_id, contact=contact, current_user=current_user)
+    try:
+        db_contact = await repository_contacts.update_contact(user=current_user, db=db, contact_id=contact_id,
+                                                              contact=contact)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Contact with this email already exists")
     if db_contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+    set_etag(response, contact_etag(db_contact.id, db_contact.version))
     return db_contact
 
 
-@router.delete("/{contact_id}")
-async def delete_contact(contact_id: int, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+@router.delete("/{contact_id}", dependencies=[Depends(query_budget(4))])
+async def delete_contact(contact_id: int, db: AsyncSession = Depends(get_write_db), current_user: User = Depends(auth_service.get_current_user)):
     """
     Delete a contact.
 
@@ -83,7 +388,7 @@ async def delete_contact(contact_id: int, db: Session = Depends(get_db), current
     :param current_user: Current authenticated user.
     :return: Confirmation message.
     """
-    db_contact = await repository_contacts.delete_contact(db=db, contact_id=contact_id, current_user=current_user)
+    db_contact = await repository_contacts.delete_contact(user=current_user, db=db, contact_id=contact_id)
     if db_contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
     return {"message": "Contact deleted successfully"}
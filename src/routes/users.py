@@ -1,19 +1,24 @@
-from fastapi import APIRouter, Depends, status, UploadFile, File
-from sqlalchemy.orm import Session
-import cloudinary
-import cloudinary.uploader
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Path
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
 from src.database.models import User
 from src.repository import users as repository_users
 from src.services.auth import auth_service
-from src.conf.config import settings
+from src.services.avatars import CONTENT_TYPE, content_digest, image_pool, read_upload
+from src.services.storage import avatar_storage
+from src.services.query_budget import query_budget
+from src.conf.config import config
 from src.schemas import UserDb
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# Avatar file names carry a content hash, so a file never changes once served
+AVATAR_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
-@router.get("/me/", response_model=UserDb)
+
+@router.get("/me/", response_model=UserDb, dependencies=[Depends(query_budget(1))])
 async def read_users_me(current_user: User = Depends(auth_service.get_current_user)):
     """
     Retrieve the current authenticated user.
@@ -24,26 +29,37 @@ async def read_users_me(current_user: User = Depends(auth_service.get_current_us
     return current_user
 
 
-@router.patch('/avatar', response_model=UserDb)
+@router.patch('/avatar', response_model=UserDb, dependencies=[Depends(query_budget(3))])
 async def update_avatar_user(file: UploadFile = File(), current_user: User = Depends(auth_service.get_current_user),
-                             db: Session = Depends(get_db)):
+                             db: AsyncSession = Depends(get_db)):
     """
     Update the avatar of the current user.
 
+    The upload is read in chunks up to ``avatar_max_bytes``, thumbnails of
+    ``avatar_sizes`` are rendered in a process pool and stored once; the user
+    keeps the URL of the largest one.
+
     :param file: Uploaded image file.
     :param current_user: Current authenticated user.
     :param db: Database session object.
     :return: UserDb object representing the updated user.
     """
-    cloudinary.config(
-        cloud_name=settings.cloudinary_name,
-        api_key=settings.cloudinary_api_key,
-        api_secret=settings.cloudinary_api_secret,
-        secure=True
-    )
-
-    r = cloudinary.uploader.upload(file.file, public_id=f'NotesApp/{current_user.username}', overwrite=True)
-    src_url = cloudinary.CloudinaryImage(f'NotesApp/{current_user.username}')\
-                        .build_url(width=250, height=250, crop='fill', version=r.get('version'))
-    user = await repository_users.update_avatar(current_user.email, src_url, db)
+    data = await read_upload(file, config.avatar_max_bytes)
+    variants = await image_pool.render(data, tuple(config.avatar_sizes))
+    urls = await avatar_storage.save(str(current_user.id), content_digest(data), variants)
+    user = await repository_users.update_avatar(current_user.email, urls[max(urls)], db)
     return user
+
+
+@router.get('/avatars/{name}', response_class=FileResponse)
+async def read_avatar(name: str = Path(pattern=r"^\d+-[0-9a-f]{16}-\d+\.\w+$")):
+    """
+    Serve an avatar thumbnail kept in local storage.
+
+    :param name: File name of the thumbnail.
+    :return: Image with long-lived cache headers.
+    """
+    path = avatar_storage.path(name)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Avatar not found")
+    return FileResponse(path, media_type=CONTENT_TYPE, headers={"Cache-Control": AVATAR_CACHE_CONTROL})
@@ -1,6 +1,8 @@
 from datetime import datetime, date
+from enum import Enum
 from typing import List, Optional
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, ConfigDict, Field, EmailStr, model_validator
+from typing_extensions import TypedDict
 
 # Модель для контакту
 class ContactBase(BaseModel):
@@ -17,10 +19,146 @@ class ContactCreate(ContactBase):
 
 # Модель для виведення інформації про контакт користувачу
 class Contact(ContactBase):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+
+# Контакт у списках: рядок з бази даних без ORM, ті самі поля, що й у Contact
+class ContactRow(TypedDict):
     id: int
+    first_name: str
+    last_name: str
+    email: str
+    phone_number: str
+    birthday: date
+    additional_data: Optional[str]
+
+# Часткове оновлення контакту: передаються лише поля, які змінюються
+class ContactUpdate(BaseModel):
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[str] = None
+    phone_number: Optional[str] = None
+    birthday: Optional[date] = None
+    additional_data: Optional[str] = None
+
+    # Обов'язкові поля можна не передавати, але не можна очистити: null дозволено лише для additional_data
+    @model_validator(mode="after")
+    def check_required_not_null(self):
+        cleared = sorted(name for name in self.model_fields_set - {"additional_data"} if getattr(self, name) is None)
+        if cleared:
+            raise ValueError(f"Fields cannot be null: {', '.join(cleared)}")
+        return self
+
+# Фільтр контактів за точним збігом полів
+class ContactFilter(BaseModel):
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[str] = None
+    phone_number: Optional[str] = None
+    birthday: Optional[date] = None
+
+# Вибірка контактів для масових операцій: список id та/або фільтр
+class BulkSelection(BaseModel):
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=10000)
+    filter: Optional[ContactFilter] = None
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if self.ids is None and (self.filter is None or not self.filter.model_dump(exclude_none=True)):
+            raise ValueError("Either ids or a non-empty filter is required")
+        return self
+
+class BulkUpdate(BulkSelection):
+    values: ContactUpdate
+
+    @model_validator(mode="after")
+    def check_values(self):
+        if not self.values.model_fields_set:
+            raise ValueError("At least one value to update is required")
+        return self
+
+# Результат масової операції: id змінених контактів
+class BulkResult(BaseModel):
+    ids: List[int]
 
-    class Config:
-        orm_mode = True
+# Порядок сортування для пагінації курсором
+class ContactSort(str, Enum):
+    id = "id"
+    name = "name"
+    birthday = "birthday"
+
+# Формат файлу для імпорту контактів
+class ImportFormat(str, Enum):
+    csv = "csv"
+    jsonl = "jsonl"
+
+# Формат файлу для експорту контактів
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+# Помилка в окремому рядку файлу імпорту
+class ImportRowError(BaseModel):
+    row: int
+    detail: str
+
+# Звіт про імпорт контактів
+class ImportReport(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[ImportRowError]
+    seconds: float
+    rows_per_second: float
+
+# Пара можливих дублікатів: оцінка схожості від 0 до 1 та ознаки, що збіглися
+class DuplicatePair(BaseModel):
+    ids: List[int]
+    score: float
+    reasons: List[str]
+
+# Фонове завдання над контактами користувача: прогрес done з total і результат
+class ContactJob(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    kind: str
+    status: str
+    total: int
+    done: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+# Група для злиття: контакти ids переносяться в target_id і видаляються
+class MergeGroup(BaseModel):
+    target_id: int
+    ids: List[int] = Field(min_length=1, max_length=100)
+
+    @model_validator(mode="after")
+    def check_ids(self):
+        if self.target_id in self.ids or len(set(self.ids)) != len(self.ids):
+            raise ValueError("ids must be distinct and must not contain target_id")
+        return self
+
+class MergeRequest(BaseModel):
+    groups: List[MergeGroup] = Field(min_length=1, max_length=1000)
+
+    @model_validator(mode="after")
+    def check_disjoint(self):
+        seen = set()
+        for group in self.groups:
+            contacts = {group.target_id, *group.ids}
+            if seen & contacts:
+                raise ValueError("A contact may appear in one group only")
+            seen |= contacts
+        return self
+
+# Результат злиття: контакти, що залишились, та видалені
+class MergeResult(BaseModel):
+    merged: List[int]
+    deleted: List[int]
 
 # Модель для користувача
 class UserModel(BaseModel):
@@ -30,14 +168,13 @@ class UserModel(BaseModel):
 
 
 class UserDb(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     username: str
     email: str
     created_at: datetime
-    avatar: str
-
-    class Config:
-        orm_mode = True
+    avatar: Optional[str] = None
 
 
 class UserResponse(BaseModel):
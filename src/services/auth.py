@@ -1,14 +1,17 @@
+import hashlib
+import time
 from typing import Optional
 
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
 from src.repository import users as repository_users
+from src.services.cache import TTLCache, user_cache
+from src.services import passwords
 from src.conf.config import config
 
 class Auth:
@@ -16,29 +19,51 @@ class Auth:
     Authentication service class.
     """
 
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_context = passwords.pwd_context
     SECRET_KEY = config.secret_key
     ALGORITHM = config.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+    # verified payloads keyed by token digest, each entry lives until the token expires
+    token_cache = TTLCache(config.jwt_cache_size, ttl=0)
 
-    def verify_password(self, plain_password, hashed_password):
+    def decode_token(self, token: str) -> dict:
         """
-        Verify the plain password against the hashed password.
+        Verify a token and return its payload, skipping the signature check for tokens seen before.
+
+        The cached payload is only returned until the token's ``exp``, so an
+        expired token is rejected exactly as ``jwt.decode`` would. Callers
+        still check the scope themselves.
+
+        :param token: Encoded JWT.
+        :return: Verified payload, shared between calls; do not modify it.
+        :raises JWTError: If the token is invalid or expired.
+        """
+        key = hashlib.sha256(token.encode()).digest()
+        payload = self.token_cache.get(key)
+        if payload is None:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            if "exp" in payload:
+                self.token_cache.set(key, payload, ttl=payload["exp"] - time.time())
+        return payload
+
+    async def verify_password(self, plain_password, hashed_password):
+        """
+        Verify the plain password against the hashed password in the password pool.
 
         :param plain_password: Plain password.
         :param hashed_password: Hashed password.
         :return: Boolean indicating whether the password is verified.
         """
-        return self.pwd_context.verify(plain_password, hashed_password)
+        return await passwords.password_pool.run(passwords.verify_password, plain_password, hashed_password)
 
-    def get_password_hash(self, password: str):
+    async def get_password_hash(self, password: str):
         """
-        Generate the hash of the given password.
+        Generate the hash of the given password in the password pool.
 
         :param password: Password to hash.
         :return: Hashed password.
         """
-        return self.pwd_context.hash(password)
+        return await passwords.password_pool.run(passwords.hash_password, password)
 
     async def create_access_token(self, data: dict, expires_delta: Optional[float] = None):
         """
@@ -82,15 +107,15 @@ class Auth:
         :return: Email extracted from the token.
         """
         try:
-            payload = jwt.decode(refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload['scope'] == 'refresh_token':
+            payload = self.decode_token(refresh_token)
+            if payload.get('scope') == 'refresh_token':
                 email = payload['sub']
                 return email
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid scope for token')
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
         """
         Get the current authenticated user from the access token.
 
@@ -106,8 +131,8 @@ class Auth:
 
         try:
             # Decode JWT
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload['scope'] == 'access_token':
+            payload = self.decode_token(token)
+            if payload.get('scope') == 'access_token':
                 email = payload["sub"]
                 if email is None:
                     raise credentials_exception
@@ -116,9 +141,14 @@ class Auth:
         except JWTError as e:
             raise credentials_exception
 
-        user = await repository_users.get_user_by_email(email, db)
+        user = await user_cache.get(email)
         if user is None:
-            raise credentials_exception
+            user = await repository_users.get_user_by_email(email, db)
+            if user is None:
+                raise credentials_exception
+            await user_cache.set(user)
+            # cached and uncached users behave the same: detached from the request session
+            db.expunge(user)
         return user
 
     async def create_email_token(self, data: dict):
@@ -142,7 +172,7 @@ class Auth:
         :return: Email extracted from the token.
         """
         try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_token(token)
             email = payload["sub"]
             return email
         except JWTError as e:
@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException, UploadFile, status
+
+from src.conf.config import config
+
+CHUNK_SIZE = 64 * 1024
+FORMAT = "WEBP"
+CONTENT_TYPE = "image/webp"
+EXTENSION = "webp"
+
+
+def render_variants(data: bytes, sizes: tuple[int, ...]) -> dict[int, bytes]:
+    """
+    Crop an image to a square and encode one thumbnail per size.
+
+    Module level so the process pool can pickle it.
+
+    :param data: Uploaded image bytes.
+    :param sizes: Edge lengths of the thumbnails in pixels.
+    :return: Encoded thumbnail per size.
+    :raises ValueError: The data is not an image Pillow can read.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    except (UnidentifiedImageError, OSError) as err:
+        raise ValueError(str(err)) from err
+    variants = {}
+    for size in sizes:
+        buffer = io.BytesIO()
+        ImageOps.fit(image, (size, size), Image.LANCZOS).save(buffer, FORMAT, quality=85)
+        variants[size] = buffer.getvalue()
+    return variants
+
+
+class ImagePool:
+    """
+    Lazily started process pool for thumbnail rendering, so image decoding
+    never runs on an API worker's event loop.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def render(self, data: bytes, sizes: tuple[int, ...]) -> dict[int, bytes]:
+        """
+        Render thumbnails in a worker process.
+
+        :param data: Uploaded image bytes.
+        :param sizes: Edge lengths of the thumbnails in pixels.
+        :return: Encoded thumbnail per size.
+        :raises HTTPException: 400 when the upload is not an image.
+        """
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, render_variants, data, sizes)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File is not a supported image")
+
+    def shutdown(self):
+        """
+        Stop the worker processes.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+async def read_upload(file: UploadFile, limit: int) -> bytes:
+    """
+    Read an upload in chunks, giving up as soon as it exceeds the limit.
+
+    :param file: Uploaded file.
+    :param limit: Maximum size in bytes.
+    :return: File content.
+    :raises HTTPException: 413 when the file is larger than the limit.
+    """
+    too_large = HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                              detail=f"Avatar must not exceed {limit} bytes")
+    if file.size is not None and file.size > limit:
+        raise too_large
+    chunks, size = [], 0
+    while chunk := await file.read(CHUNK_SIZE):
+        size += len(chunk)
+        if size > limit:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def content_digest(data: bytes) -> str:
+    """
+    Short content hash used to version avatar URLs.
+
+    :param data: Uploaded image bytes.
+    :return: First 16 hex digits of the SHA-256.
+    """
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+image_pool = ImagePool(config.avatar_workers)
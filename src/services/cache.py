@@ -0,0 +1,178 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from redis.exceptions import RedisError
+
+from src.conf.config import config
+from src.database.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    In-process LRU cache whose entries expire after a fixed time to live.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, key):
+        """
+        Return the cached value, or None if it is missing or expired.
+
+        :param key: Cache key.
+        :return: Cached value or None.
+        """
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: float | None = None):
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        :param key: Cache key.
+        :param value: Value to store.
+        :param ttl: Time to live in seconds, the cache default if omitted.
+        """
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Remove a key if present.
+
+        :param key: Cache key.
+        """
+        self._data.pop(key, None)
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class UserCache:
+    """
+    Two tier cache of authenticated users keyed by email.
+
+    The first tier lives in the worker process, the optional second tier in
+    Redis is shared by all workers. Only the public columns of a user are
+    cached; password hash and refresh token never leave the database.
+
+    After a Redis error the cache uses the local tier only for
+    ``retry_after`` seconds, so an outage does not add a connection timeout
+    to every authenticated request.
+    """
+
+    FIELDS = ("id", "username", "email", "created_at", "avatar", "confirmed")
+    PREFIX = "user:"
+
+    def __init__(self, maxsize: int, ttl: float, redis_ttl: int, retry_after: float = 5):
+        self.local = TTLCache(maxsize, ttl)
+        self.redis_ttl = redis_ttl
+        self.redis = None
+        self.retry_after = retry_after
+        self.hits = 0
+        self.misses = 0
+        self._redis_down_until = 0.0
+
+    def _redis_up(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, err: Exception):
+        logger.warning("User cache falls back to the local tier: %s", err)
+        self._redis_down_until = time.monotonic() + self.retry_after
+
+    async def get(self, email: str) -> User | None:
+        """
+        Get a detached user by email from the local tier, then from Redis.
+
+        :param email: Email address of the user.
+        :return: Detached User object or None on a miss.
+        """
+        fields = self.local.get(email)
+        if fields is None and self._redis_up():
+            try:
+                raw = await self.redis.get(self.PREFIX + email)
+            except (RedisError, OSError) as err:
+                self._redis_failed(err)
+                raw = None
+            if raw is not None:
+                fields = json.loads(raw)
+                fields["created_at"] = fields["created_at"] and datetime.fromisoformat(fields["created_at"])
+                self.local.set(email, fields)
+        if fields is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return User(**fields)
+
+    async def set(self, user: User):
+        """
+        Cache the public columns of a user.
+
+        :param user: User object loaded from the database.
+        """
+        fields = {name: getattr(user, name) for name in self.FIELDS}
+        self.local.set(user.email, fields)
+        if self._redis_up():
+            try:
+                await self.redis.set(self.PREFIX + user.email, json.dumps(fields, default=datetime.isoformat),
+                                     ex=self.redis_ttl)
+            except (RedisError, OSError) as err:
+                self._redis_failed(err)
+
+    async def invalidate(self, email: str):
+        """
+        Drop a user from both tiers after it changed in the database.
+
+        Other workers may keep their local copy until its time to live ends.
+
+        :param email: Email address of the user.
+        """
+        self.local.delete(email)
+        if self._redis_up():
+            try:
+                await self.redis.delete(self.PREFIX + email)
+            except (RedisError, OSError) as err:
+                self._redis_failed(err)
+
+    def clear(self):
+        """
+        Empty the local tier, reset the counters and retry Redis on the next call.
+        """
+        self.local.clear()
+        self.hits = self.misses = 0
+        self._redis_down_until = 0.0
+
+    def stats(self) -> dict:
+        """
+        Hit and miss counters of this worker.
+
+        :return: Dictionary with hits, misses, hit ratio and local size.
+        """
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / total if total else 0.0,
+                "size": len(self.local)}
+
+
+user_cache = UserCache(config.user_cache_size, config.user_cache_ttl, config.user_cache_redis_ttl)
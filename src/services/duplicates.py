@@ -0,0 +1,276 @@
+"""
+Duplicate contact detection.
+
+Comparing every pair of contacts is quadratic, so candidates are generated
+by blocking: each contact gets a few keys (normalized email, the last digits
+of its phone number, phonetic codes of its names) and only contacts sharing
+a key are compared. Blocks larger than ``max_block`` (very common names) are
+skipped; they would bring back the quadratic cost and such contacts still
+meet through their email or phone keys.
+"""
+import asyncio
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from datetime import date, datetime
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Awaitable, Callable, Iterable, NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.database.models import Contact, ContactJob
+from src.repository.contacts import stream_contacts
+
+logger = logging.getLogger(__name__)
+
+# Columns the detection reads; additional_data is not compared
+DUPLICATE_COLUMNS = (Contact.id, Contact.first_name, Contact.last_name, Contact.email, Contact.phone_number,
+                     Contact.birthday)
+
+SOUNDEX_CODES = {letter: digit for digit, letters in (("1", "bfpv"), ("2", "cgjkqsxz"), ("3", "dt"), ("4", "l"),
+                                                       ("5", "mn"), ("6", "r")) for letter in letters}
+# Providers that ignore dots in the local part of an address
+DOTLESS_DOMAINS = {"gmail.com", "googlemail.com"}
+# National significant number length; shorter numbers are not used as keys
+PHONE_DIGITS = 9
+
+WEIGHTS = {"email": 0.5, "phone": 0.35, "name": 0.35, "birthday": 0.15}
+BIRTHDAY_MISMATCH = -0.25
+NAME_SIMILARITY = 0.8
+
+
+def fold(text: str | None) -> str:
+    """
+    Lower-case a string and strip accents, ``Zoë`` becomes ``zoe``.
+
+    :param text: String to fold or None.
+    :return: Folded string, empty for None.
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def email_key(email: str | None) -> str | None:
+    """
+    Normalized email: lower case, no ``+tag``, no dots for providers that ignore them.
+
+    :param email: Email address as entered or None.
+    :return: Blocking key such as ``john@gmail.com``, or None without a local part and domain.
+    """
+    local, _, domain = fold(email).strip().partition("@")
+    local = local.split("+", 1)[0]
+    if domain in DOTLESS_DOMAINS:
+        local, domain = local.replace(".", ""), "gmail.com"
+    return f"{local}@{domain}" if local and domain else None
+
+
+def phone_key(phone: str | None) -> str | None:
+    """
+    Last digits of a phone number, the same with or without country code and formatting.
+
+    :param phone: Phone number as entered or None.
+    :return: Last ``PHONE_DIGITS`` digits, or None for shorter numbers.
+    """
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-PHONE_DIGITS:] if len(digits) >= PHONE_DIGITS else None
+
+
+def soundex(name: str | None) -> str | None:
+    """
+    American Soundex code of a name, so ``Smith`` and ``Smyth`` get the same key.
+
+    Names without Latin letters are keyed by the folded name itself.
+
+    :param name: First or last name, or None.
+    :return: Code such as ``S530``, the folded name, or None for a name without letters.
+    """
+    folded = fold(name)
+    letters = [char for char in folded if "a" <= char <= "z"]
+    if not letters:
+        word = "".join(char for char in folded if char.isalpha())
+        return word or None
+    code = letters[0].upper()
+    last = SOUNDEX_CODES.get(letters[0])
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter)
+        if digit and digit != last:
+            code += digit
+        if letter not in "hw":
+            last = digit
+    return (code + "000")[:4]
+
+
+class Fingerprint(NamedTuple):
+    id: int
+    email: str | None
+    phone: str | None
+    # phonetic codes of both names, sorted, so swapped first and last names match
+    names: tuple[str, ...]
+    # folded name words, sorted, for the similarity ratio
+    name: str
+    birthday: date | None
+
+
+def fingerprint(row) -> Fingerprint:
+    """
+    Normalized comparison keys of a contact.
+
+    :param row: Contact row with ``DUPLICATE_COLUMNS``.
+    :return: Fingerprint of the contact.
+    """
+    words = re.findall(r"\w+", fold(f"{row.first_name or ''} {row.last_name or ''}"))
+    names = tuple(sorted(code for code in (soundex(row.first_name), soundex(row.last_name)) if code))
+    return Fingerprint(row.id, email_key(row.email), phone_key(row.phone_number), names, " ".join(sorted(words)),
+                       row.birthday)
+
+
+def candidate_pairs(fingerprints: Iterable[Fingerprint], max_block: int) -> list[tuple[int, int]]:
+    """
+    Pairs of contacts sharing at least one blocking key.
+
+    :param fingerprints: Contacts, in ascending id order.
+    :param max_block: Blocks with more contacts are skipped.
+    :return: Distinct ``(smaller id, larger id)`` pairs, sorted.
+    """
+    blocks = defaultdict(list)
+    for fp in fingerprints:
+        if fp.email:
+            blocks["email", fp.email].append(fp.id)
+        if fp.phone:
+            blocks["phone", fp.phone].append(fp.id)
+        if fp.names:
+            blocks["name", fp.names].append(fp.id)
+    pairs = set()
+    skipped = 0
+    for ids in blocks.values():
+        if len(ids) > max_block:
+            skipped += 1
+        elif len(ids) > 1:
+            pairs.update(combinations(ids, 2))
+    if skipped:
+        logger.info("Skipped %s blocks larger than %s contacts", skipped, max_block)
+    return sorted(pairs)
+
+
+def score(a: Fingerprint, b: Fingerprint, threshold: float = 0.0) -> tuple[float, list[str]]:
+    """
+    Similarity of two contacts from 0 to 1 and the signals that matched.
+
+    The name ratio is the costly part; it is skipped when even identical
+    names could not lift the pair to ``threshold``, and the score is then too low.
+
+    :param a: Fingerprint of one contact.
+    :param b: Fingerprint of the other contact.
+    :param threshold: Minimum score the caller keeps, 0 to always compare names.
+    :return: Score and the matched signals: email, phone, name and birthday.
+    """
+    total = 0.0
+    reasons = []
+    if a.email and a.email == b.email:
+        total += WEIGHTS["email"]
+        reasons.append("email")
+    if a.phone and a.phone == b.phone:
+        total += WEIGHTS["phone"]
+        reasons.append("phone")
+    if a.birthday and b.birthday:
+        total += WEIGHTS["birthday"] if a.birthday == b.birthday else BIRTHDAY_MISMATCH
+    if a.name and b.name and total + WEIGHTS["name"] >= threshold:
+        matcher = SequenceMatcher(None, a.name, b.name)
+        if matcher.quick_ratio() >= NAME_SIMILARITY and (ratio := matcher.ratio()) >= NAME_SIMILARITY:
+            total += WEIGHTS["name"] * ratio
+            reasons.append("name")
+    if a.birthday and a.birthday == b.birthday:
+        reasons.append("birthday")
+    return max(0.0, min(total, 1.0)), reasons
+
+
+def score_pairs(fingerprints: dict[int, Fingerprint], pairs: list[tuple[int, int]], threshold: float) -> list[dict]:
+    """
+    Score candidate pairs and keep those at or above the threshold.
+
+    :param fingerprints: Fingerprint per contact id.
+    :param pairs: Candidate pairs from :func:`candidate_pairs`.
+    :param threshold: Minimum score of a kept pair.
+    :return: ``DuplicatePair`` dicts.
+    """
+    found = []
+    for a, b in pairs:
+        value, reasons = score(fingerprints[a], fingerprints[b], threshold)
+        if value >= threshold:
+            found.append({"ids": [a, b], "score": round(value, 3), "reasons": reasons})
+    return found
+
+
+async def detect_duplicates(rows: Iterable, threshold: float, max_block: int,
+                            progress: Callable[[int, int], Awaitable] | None = None,
+                            chunk_size: int = 20000) -> list[dict]:
+    """
+    Find likely duplicates among a user's contacts.
+
+    The CPU bound steps run in a thread, in chunks of candidate pairs, so the
+    event loop keeps serving requests and progress can be reported between chunks.
+
+    :param rows: Contact rows with ``DUPLICATE_COLUMNS``, in ascending id order.
+    :param threshold: Minimum score of a reported pair.
+    :param max_block: Largest block of contacts sharing a key that is compared.
+    :param progress: Awaited with (scored pairs, candidate pairs) after each chunk.
+    :param chunk_size: Candidate pairs scored per thread call.
+    :return: ``DuplicatePair`` dicts, highest score first.
+    """
+    fingerprints = await asyncio.to_thread(lambda: {row.id: fingerprint(row) for row in rows})
+    pairs = await asyncio.to_thread(candidate_pairs, fingerprints.values(), max_block)
+    if progress:
+        await progress(0, len(pairs))
+    found = []
+    for start in range(0, len(pairs), chunk_size):
+        found += await asyncio.to_thread(score_pairs, fingerprints, pairs[start:start + chunk_size], threshold)
+        if progress:
+            await progress(min(start + chunk_size, len(pairs)), len(pairs))
+    found.sort(key=lambda pair: (-pair["score"], pair["ids"]))
+    return found
+
+
+async def load_rows(user_id: int, bind: AsyncEngine) -> list:
+    """
+    Read the ``DUPLICATE_COLUMNS`` of every contact of a user.
+
+    :param user_id: Identifier of the user.
+    :param bind: Engine to stream the rows from.
+    :return: Contact rows in ascending id order.
+    """
+    rows = []
+    async for batch in stream_contacts(user_id, bind, columns=DUPLICATE_COLUMNS):
+        rows.extend(batch)
+    return rows
+
+
+async def run_duplicates_job(bind: AsyncEngine, job_id: int):
+    """
+    Run a ``duplicates`` job as a background task and store its progress and result.
+
+    :param bind: Engine to open a session on; the request session is closed by now.
+    :param job_id: Identifier of a pending job.
+    """
+    async with AsyncSession(bind, expire_on_commit=False) as db:
+        job = await db.get(ContactJob, job_id)
+        job.status = "running"
+        await db.commit()
+
+        async def progress(done: int, total: int):
+            job.done, job.total = done, total
+            await db.commit()
+
+        try:
+            rows = await load_rows(job.user_id, bind)
+            pairs = await detect_duplicates(rows, job.params["threshold"], job.params["max_block"], progress)
+            job.result = {"contacts": len(rows), "pairs": pairs}
+            job.status = "done"
+        except Exception as err:
+            logger.exception("Duplicates job %s failed", job_id)
+            await db.rollback()
+            job.status = "failed"
+            job.error = str(err)[:500]
+        job.finished_at = datetime.utcnow()
+        await db.commit()
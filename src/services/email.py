@@ -1,46 +1,38 @@
-from pathlib import Path
-
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.database.models import EmailMessage
 from src.services.auth import auth_service
-from src.conf.config import config
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=config.mail_username,
-    MAIL_PASSWORD=config.mail_password,
-    MAIL_FROM=config.mail_form,
-    MAIL_PORT=config.mail_port,
-    MAIL_SERVER=config.mail_server,
-    MAIL_FROM_NAME="Desired Name",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
-)
+
+async def enqueue_email(recipient: str, subject: str, template: str, context: dict,
+                        db: AsyncSession) -> EmailMessage:
+    """
+    Store an email in the outbox; the mail worker delivers it.
+
+    :param recipient: Email address of the recipient.
+    :param subject: Subject line.
+    :param template: Template file name in ``src/services/templates``.
+    :param context: JSON serializable template variables.
+    :param db: Database session object.
+    :return: Queued message.
+    """
+    message = EmailMessage(recipient=recipient, subject=subject, template=template, context=context)
+    db.add(message)
+    await db.commit()
+    return message
 
 
-async def send_email(email: EmailStr, username: str, host: str):
+async def send_email(email: EmailStr, username: str, host: str, db: AsyncSession) -> EmailMessage:
     """
-    Send an email to the specified email address.
+    Queue the confirmation email for the specified email address.
 
     :param email: Email address of the recipient.
     :param username: Username of the recipient.
     :param host: Host URL for confirmation link.
+    :param db: Database session object.
+    :return: Queued message.
     """
-    try:
-        token_verification = auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email ",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": token_verification},
-            subtype=MessageType.html
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="email_template.html")
-    except ConnectionErrors as err:
-        print(err)
-
+    token_verification = await auth_service.create_email_token({"sub": email})
+    return await enqueue_email(email, "Confirm your email ", "email_template.html",
+                               {"host": str(host), "username": username, "token": token_verification}, db)
@@ -0,0 +1,312 @@
+"""
+Delivers the email outbox over a small pool of long-lived SMTP connections.
+
+Usage::
+
+    python -m src.services.email_worker [--once]
+"""
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage as MIMEMessage
+from email.utils import formataddr
+from functools import lru_cache
+from pathlib import Path
+
+import aiosmtplib
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.conf.config import config
+from src.database.models import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_FOLDER = Path(__file__).parent / "templates"
+environment = Environment(loader=FileSystemLoader(TEMPLATE_FOLDER), autoescape=select_autoescape())
+
+
+@lru_cache(maxsize=None)
+def get_template(name: str) -> Template:
+    """
+    Load and compile a template once per process.
+
+    :param name: Template file name.
+    :return: Compiled template.
+    """
+    return environment.get_template(name)
+
+
+def retry_delay(attempts: int, base: float) -> timedelta:
+    """
+    Exponential backoff before the next delivery attempt, capped at one hour.
+
+    :param attempts: Attempts made so far.
+    :param base: Delay after the first failure in seconds.
+    :return: Delay until the next attempt.
+    """
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 3600))
+
+
+class SMTPPool:
+    """
+    Reuses up to ``size`` authenticated SMTP connections.
+
+    A connection is opened on first use and kept for later messages; one that
+    fails is closed and reopened by the next sender, so a dropped session costs
+    a reconnect rather than a lost message.
+    """
+
+    def __init__(self, size: int, **options):
+        self.size = size
+        self.options = options
+        self.connects = 0
+        self._idle = None
+
+    @property
+    def idle(self) -> asyncio.Queue:
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                self._idle.put_nowait(None)
+        return self._idle
+
+    async def send(self, message: MIMEMessage):
+        """
+        Send a message over a pooled connection.
+
+        :param message: Message to send.
+        :raises aiosmtplib.SMTPException: The server rejected the message or the connection failed.
+        """
+        client = await self.idle.get()
+        try:
+            if client is None or not client.is_connected:
+                client = aiosmtplib.SMTP(**self.options)
+                await client.connect()
+                self.connects += 1
+            await client.send_message(message)
+        except BaseException:
+            if client is not None:
+                client.close()
+            client = None
+            raise
+        finally:
+            self.idle.put_nowait(client)
+
+    async def close(self):
+        """
+        Quit all idle connections.
+        """
+        if self._idle is None:
+            return
+        while not self._idle.empty():
+            client = self._idle.get_nowait()
+            if client is not None and client.is_connected:
+                try:
+                    await client.quit()
+                except aiosmtplib.SMTPException:
+                    client.close()
+        self._idle = None
+
+
+class EmailWorker:
+    """
+    Claims due messages from the outbox in batches and delivers them.
+
+    Claiming bumps ``attempts`` and pushes ``next_attempt_at`` out by a lease,
+    so a message held by a worker that dies becomes due again instead of being
+    lost. Failed messages are retried with exponential backoff until
+    ``max_attempts`` is reached.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, pool: SMTPPool, sender: str,
+                 batch_size: int = 50, max_attempts: int = 5, retry_base: float = 30, lease: float = 300):
+        self.session_factory = session_factory
+        self.pool = pool
+        self.sender = sender
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.lease = lease
+        self.sent = 0
+        self.failed = 0
+
+    async def claim(self) -> list[EmailMessage]:
+        """
+        Lease the next batch of due messages.
+
+        :return: Claimed messages with ``attempts`` already incremented.
+        """
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            stmt = (select(EmailMessage)
+                    .where(EmailMessage.status == "pending", EmailMessage.next_attempt_at <= now)
+                    .order_by(EmailMessage.next_attempt_at, EmailMessage.id)
+                    .limit(self.batch_size))
+            if db.bind.dialect.name == "postgresql":
+                stmt = stmt.with_for_update(skip_locked=True)
+            messages = (await db.execute(stmt)).scalars().all()
+            if not messages:
+                return []
+            # the next_attempt_at guard skips rows another worker leased in the meantime
+            result = await db.execute(
+                update(EmailMessage)
+                .where(EmailMessage.id.in_([message.id for message in messages]),
+                       EmailMessage.next_attempt_at <= now)
+                .values(attempts=EmailMessage.attempts + 1, next_attempt_at=now + timedelta(seconds=self.lease))
+                .returning(EmailMessage.id)
+                .execution_options(synchronize_session=False)
+            )
+            claimed = set(result.scalars())
+            await db.commit()
+        for message in messages:
+            message.attempts += 1
+        return [message for message in messages if message.id in claimed]
+
+    def build(self, message: EmailMessage) -> MIMEMessage:
+        """
+        Render a queued message.
+
+        :param message: Outbox row.
+        :return: MIME message ready to send.
+        """
+        mime = MIMEMessage()
+        mime["From"] = self.sender
+        mime["To"] = message.recipient
+        mime["Subject"] = message.subject
+        mime.set_content(get_template(message.template).render(**message.context), subtype="html")
+        return mime
+
+    async def deliver(self, message: EmailMessage) -> tuple[str | None, bool]:
+        """
+        Send one message.
+
+        A message that cannot be rendered (missing template, bad context) would
+        fail the same way on every attempt, so it is not retried. Unexpected
+        errors while sending are logged and retried like SMTP errors.
+
+        :param message: Outbox row.
+        :return: None on success, otherwise the error text; and whether to retry.
+        """
+        try:
+            mime = self.build(message)
+        except Exception as err:
+            logger.exception("Email %s could not be rendered", message.id)
+            return f"Rendering failed: {err.__class__.__name__}: {err}", False
+        try:
+            await self.pool.send(mime)
+        except (aiosmtplib.SMTPException, OSError) as err:
+            return str(err) or err.__class__.__name__, True
+        except Exception as err:
+            logger.exception("Unexpected error sending email %s", message.id)
+            return f"{err.__class__.__name__}: {err}", True
+        return None, True
+
+    async def run_once(self) -> int:
+        """
+        Deliver one batch and record the outcome.
+
+        :return: Number of messages claimed.
+        """
+        messages = await self.claim()
+        if not messages:
+            return 0
+        outcomes = await asyncio.gather(*(self.deliver(message) for message in messages))
+        now = datetime.utcnow()
+        sent = [message.id for message, (error, _) in zip(messages, outcomes) if error is None]
+        async with self.session_factory() as db:
+            if sent:
+                await db.execute(update(EmailMessage).where(EmailMessage.id.in_(sent))
+                                 .values(status="sent", sent_at=now, last_error=None)
+                                 .execution_options(synchronize_session=False))
+            for message, (error, retry) in zip(messages, outcomes):
+                if error is None:
+                    continue
+                values = {"last_error": error[:500]}
+                if not retry or message.attempts >= self.max_attempts:
+                    values["status"] = "failed"
+                else:
+                    values["next_attempt_at"] = now + retry_delay(message.attempts, self.retry_base)
+                await db.execute(update(EmailMessage).where(EmailMessage.id == message.id).values(**values)
+                                 .execution_options(synchronize_session=False))
+                logger.warning("Delivery of email %s to %s failed: %s", message.id, message.recipient, error)
+            await db.commit()
+        self.sent += len(sent)
+        self.failed += len(messages) - len(sent)
+        return len(messages)
+
+    async def drain(self) -> dict:
+        """
+        Deliver batches until nothing is due.
+
+        :return: Dictionary with sent and failed attempts, seconds and messages per second.
+        """
+        sent, failed = self.sent, self.failed
+        started = time.perf_counter()
+        while await self.run_once():
+            pass
+        seconds = time.perf_counter() - started
+        sent, failed = self.sent - sent, self.failed - failed
+        return {"sent": sent, "failed": failed, "seconds": round(seconds, 3),
+                "messages_per_second": round(sent / seconds, 1) if seconds else 0.0}
+
+    async def run(self, poll_interval: float, stop: asyncio.Event | None = None):
+        """
+        Drain the outbox, then poll it until stopped.
+
+        :param poll_interval: Seconds to wait when nothing is due.
+        :param stop: Event that ends the loop.
+        """
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                stats = await self.drain()
+            except Exception:
+                # e.g. the database is unreachable; claimed messages become due again when their lease ends
+                logger.exception("Email batch failed, retrying after %s seconds", poll_interval)
+            else:
+                if stats["sent"] or stats["failed"]:
+                    logger.info("Sent %(sent)s emails (%(failed)s failed) at %(messages_per_second)s messages/s",
+                                stats)
+            try:
+                await asyncio.wait_for(stop.wait(), poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def smtp_pool() -> SMTPPool:
+    """
+    SMTP pool configured from the application settings.
+
+    :return: Connection pool for the configured server.
+    """
+    credentials = {"username": config.mail_username, "password": config.mail_password} \
+        if config.mail_use_credentials else {}
+    return SMTPPool(config.email_smtp_connections, hostname=config.mail_server, port=config.mail_port,
+                    use_tls=config.mail_ssl_tls, start_tls=config.mail_starttls, **credentials)
+
+
+async def main(once: bool):
+    from src.database.db import AsyncSessionLocal
+
+    pool = smtp_pool()
+    worker = EmailWorker(AsyncSessionLocal, pool, formataddr((config.mail_from_name, config.mail_from)),
+                         batch_size=config.email_batch_size, max_attempts=config.email_max_attempts,
+                         retry_base=config.email_retry_delay)
+    try:
+        if once:
+            print(await worker.drain())
+        else:
+            await worker.run(config.email_poll_interval)
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="drain the outbox and exit")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parser.parse_args().once))
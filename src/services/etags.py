@@ -0,0 +1,53 @@
+import hashlib
+
+from fastapi import Response, status
+
+# Clients may store responses but must revalidate them with If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """
+    Strong ETag derived from the parts that identify a representation.
+
+    :param parts: Values such as the owner, the version and the query parameters.
+    :return: Quoted entity tag.
+    """
+    digest = hashlib.sha1(":".join(map(str, parts)).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches an ETag, using the weak comparison RFC 9110 requires for it.
+
+    :param if_none_match: Header value, a list of entity tags or ``*``.
+    :param etag: Current entity tag.
+    :return: True when the client's copy is current.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Empty 304 response for a matching If-None-Match.
+
+    :param etag: Current entity tag.
+    :return: Response without a body.
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str):
+    """
+    Attach the entity tag and the revalidation policy to a response.
+
+    :param response: Response being built.
+    :param etag: Current entity tag.
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
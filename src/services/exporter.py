@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.repository import contacts as repository_contacts
+from src.schemas import ExportFormat
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+FIELDS = [column.key for column in repository_contacts.CONTACT_COLUMNS]
+
+
+def encode_batch(rows: list, fmt: ExportFormat) -> bytes:
+    """
+    Encode a batch of contact rows as NDJSON lines or CSV records.
+
+    :param rows: Rows in ``CONTACT_COLUMNS`` order.
+    :param fmt: Output format.
+    :return: Encoded chunk.
+    """
+    if fmt == ExportFormat.ndjson:
+        return "".join(json.dumps(dict(zip(FIELDS, row)), default=date.isoformat) + "\n" for row in rows).encode()
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def export_contacts(user_id: int, bind: AsyncEngine, fmt: ExportFormat,
+                          gzip: bool = False) -> AsyncIterator[bytes]:
+    """
+    Produce the export of a user's contacts chunk by chunk.
+
+    :param user_id: Identifier of the owner.
+    :param bind: Engine to read from.
+    :param fmt: Output format.
+    :param gzip: Compress the output on the fly.
+    :return: Async iterator of body chunks for a streaming response.
+    """
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+
+    def emit(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    if fmt == ExportFormat.csv:
+        yield emit(encode_batch([FIELDS], fmt))
+    async for rows in repository_contacts.stream_contacts(user_id, bind):
+        chunk = emit(encode_batch(rows, fmt))
+        if chunk:
+            yield chunk
+    if compressor:
+        yield compressor.flush()
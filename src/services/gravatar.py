@@ -0,0 +1,76 @@
+import logging
+
+from libgravatar import Gravatar, sanitize_email
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.conf.config import config
+from src.database.models import User
+from src.services.cache import TTLCache, user_cache
+
+logger = logging.getLogger(__name__)
+
+avatar_cache = TTLCache(config.gravatar_cache_size, ttl=config.gravatar_cache_ttl)
+
+
+def gravatar_url(email: str) -> str | None:
+    """
+    Gravatar image URL of an email, memoized by the normalized email.
+
+    Addresses differing only in case or surrounding spaces share an entry,
+    and a hit skips hashing the address and building the URL.
+
+    :param email: Email address.
+    :return: Image URL, or None when it cannot be built.
+    """
+    key = sanitize_email(email)
+    url = avatar_cache.get(key)
+    if url is None:
+        try:
+            url = Gravatar(email).get_image()
+        except Exception as err:
+            logger.warning("Gravatar lookup for %s failed: %s", email, err)
+            return None
+        avatar_cache.set(key, url)
+    return url
+
+
+async def resolve_avatars(bind: AsyncEngine, user_ids: list[int] | None = None, batch_size: int = 1000) -> int:
+    """
+    Fill in ``User.avatar`` from Gravatar for users that have none.
+
+    Runs after the users are committed, as a background task of signup or
+    once for a bulk import; avatars a user uploaded meanwhile are kept.
+
+    :param bind: Engine to open a session on; the request session is closed by now.
+    :param user_ids: Users to resolve, or None for every user without an avatar.
+    :param batch_size: Users updated per statement.
+    :return: Number of users updated.
+    """
+    updated = 0
+    last_id = 0
+    async with AsyncSession(bind, expire_on_commit=False) as db:
+        while True:
+            stmt = (select(User.id, User.email)
+                    .where(User.avatar.is_(None), User.id > last_id)
+                    .order_by(User.id)
+                    .limit(batch_size))
+            if user_ids is not None:
+                stmt = stmt.where(User.id.in_(user_ids))
+            rows = (await db.execute(stmt)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            values = [{"user_id": row.id, "url": url} for row in rows if (url := gravatar_url(row.email))]
+            if values:
+                await db.execute(
+                    update(User.__table__)
+                    .where(User.__table__.c.id == bindparam("user_id"), User.__table__.c.avatar.is_(None))
+                    .values(avatar=bindparam("url")),
+                    values,
+                )
+                await db.commit()
+                updated += len(values)
+            for row in rows:
+                await user_cache.invalidate(row.email)
+    return updated
@@ -0,0 +1,157 @@
+import time
+
+import redis.asyncio as redis
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.database.db import QueryStats, request_queries
+
+FAST_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Time until the response is sent",
+                            ["method", "route", "status"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being handled", ["method"])
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "Duration of single SQL statements",
+                              buckets=FAST_BUCKETS)
+DB_QUERIES_PER_REQUEST = Histogram("db_queries_per_request", "SQL statements executed per request", ["route"],
+                                   buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100))
+DB_TIME_PER_REQUEST = Histogram("db_request_query_seconds", "Total SQL time per request", ["route"],
+                                buckets=FAST_BUCKETS)
+POOL_CHECKOUT_WAIT = Histogram("db_pool_checkout_wait_seconds", "Time to get a connection from the pool",
+                               buckets=FAST_BUCKETS)
+REDIS_LATENCY = Histogram("redis_command_duration_seconds", "Duration of Redis commands", ["command"],
+                          buckets=FAST_BUCKETS)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def observe_query(conn, cursor, statement, parameters, context, executemany):
+    DB_QUERY_DURATION.observe(context.query_seconds)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request and counting its SQL statements.
+
+    Latency is taken when the last body chunk is sent, so background tasks
+    that run after the response are not included. Routes are labelled by
+    their path template, unmatched paths as ``unmatched``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # labelled children per (method, route, status); .labels() is the costly part of an observation
+        self._children = {}
+        self._in_flight = {}
+
+    def children(self, method: str, path: str, status_code: int) -> tuple:
+        key = (method, path, status_code)
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (REQUEST_LATENCY.labels(method, path, str(status_code)),
+                                              DB_QUERIES_PER_REQUEST.labels(path), DB_TIME_PER_REQUEST.labels(path))
+        return children
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        in_flight = self._in_flight.get(method)
+        if in_flight is None:
+            in_flight = self._in_flight[method] = IN_FLIGHT.labels(method)
+        stats = QueryStats()
+        token = request_queries.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+        finished = None
+
+        async def send_wrapper(message):
+            nonlocal status_code, finished
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished = time.perf_counter()
+            await send(message)
+
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            request_queries.reset(token)
+            latency, queries, query_time = self.children(method, getattr(scope.get("route"), "path", "unmatched"),
+                                                         status_code)
+            latency.observe((finished or time.perf_counter()) - started)
+            queries.observe(stats.count)
+            query_time.observe(stats.seconds)
+
+
+class PoolCollector:
+    """
+    Reports size, checked out and overflow connections of an engine's pool at scrape time.
+    """
+
+    def __init__(self, engine: Engine, name: str):
+        self.engine = engine
+        self.name = name
+
+    def collect(self):
+        pool = self.engine.pool
+        for metric, method, documentation in (("db_pool_size", "size", "Configured pool size"),
+                                              ("db_pool_checked_out", "checkedout", "Connections in use"),
+                                              ("db_pool_overflow", "overflow", "Connections over the pool size")):
+            if hasattr(pool, method):
+                family = GaugeMetricFamily(metric, documentation, labels=["engine"])
+                family.add_metric([self.name], getattr(pool, method)())
+                yield family
+
+
+def instrument_pool(engine: Engine, name: str) -> PoolCollector:
+    """
+    Time connection checkouts and export the pool state of an engine.
+
+    The pool has no event before a checkout starts, so its ``connect`` is
+    wrapped; ``Engine.dispose`` builds a new pool, call this again after it.
+
+    :param engine: Synchronous engine (``async_engine.sync_engine`` for async ones).
+    :param name: Value of the ``engine`` label.
+    :return: Registered collector of the pool state.
+    """
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+    collector = PoolCollector(engine, name)
+    REGISTRY.register(collector)
+    return collector
+
+
+class InstrumentedRedis(redis.Redis):
+    """
+    Redis client that records the latency of every command, scripts included.
+    """
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_LATENCY.labels(str(args[0]).upper()).observe(time.perf_counter() - started)
+
+
+def render() -> tuple[bytes, str]:
+    """
+    Current metrics in the Prometheus text format.
+
+    :return: Body and content type.
+    """
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,101 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from src.conf.config import config
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password(password: str) -> str:
+    """
+    Hash a password with bcrypt; module level so a process pool can pickle it.
+
+    :param password: Plain password.
+    :return: Hashed password.
+    """
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Check a password against a bcrypt hash; module level so a process pool can pickle it.
+
+    :param plain_password: Plain password.
+    :param hashed_password: Hashed password.
+    :return: Whether the password matches.
+    """
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordPool:
+    """
+    Runs password hashing outside the event loop with bounded concurrency.
+
+    At most ``workers`` hashes run at once; up to ``max_pending`` calls may be
+    in flight in total, further calls are rejected with 503 so a login storm
+    cannot queue unbounded work. With ``kind="inline"`` hashing runs on the
+    event loop, which is only useful for benchmarks.
+    """
+
+    def __init__(self, kind: str, workers: int, max_pending: int):
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        return self._executor
+
+    async def run(self, fn, *args):
+        """
+        Run a hashing function in the pool.
+
+        :param fn: Module level function to call.
+        :param args: Positional arguments of the function.
+        :return: Result of the function.
+        :raises HTTPException: 503 when too many calls are already pending.
+        """
+        if self.kind == "inline":
+            return fn(*args)
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many authentication requests, try again later",
+                                headers={"Retry-After": "1"})
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        """
+        Stop the worker threads or processes.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        """
+        Current load of the pool.
+
+        :return: Dictionary with workers, in-flight calls, queue depth and rejected calls.
+        """
+        return {"workers": self.workers, "in_flight": self.pending,
+                "queued": max(0, self.pending - self.workers), "rejected": self.rejected}
+
+
+password_pool = PasswordPool(config.password_hash_executor, config.password_hash_workers,
+                             config.password_hash_max_pending)
@@ -0,0 +1,50 @@
+import logging
+
+from fastapi import Request
+
+from src.conf.config import config
+from src.database.db import request_queries
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    A route ran more SQL statements than its declared budget.
+    """
+
+
+def query_budget(limit: int):
+    """
+    Dependency declaring how many SQL statements a route may run.
+
+    Usage: ``@router.get(..., dependencies=[Depends(query_budget(3))])``. The
+    count covers the other dependencies (e.g. loading the current user) and
+    the handler, not background tasks. Going over the budget is logged; with
+    ``query_budget_strict`` (set by the test suite) the request fails instead.
+
+    :param limit: Maximum number of statements.
+    :return: Dependency checking the budget when the handler is done.
+    """
+
+    async def check(request: Request):
+        stats = request_queries.get()
+        if stats is None:
+            yield
+            return
+        start = stats.count
+        shapes = stats.shapes.copy()
+        try:
+            yield
+        finally:
+            used = stats.count - start
+            if used > limit:
+                route = getattr(request.scope.get("route"), "path", request.url.path)
+                statements = "\n".join(f"{count}x {statement}"
+                                       for statement, count in (stats.shapes - shapes).most_common())
+                message = f"{request.method} {route} ran {used} SQL statements, budget is {limit}:\n{statements}"
+                if config.query_budget_strict:
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+
+    return check
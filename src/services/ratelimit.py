@@ -0,0 +1,167 @@
+import logging
+import math
+import re
+import time
+import uuid
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request, status
+from redis.exceptions import RedisError
+
+from src.conf.config import config
+
+logger = logging.getLogger(__name__)
+
+# Sliding log of the request times in one sorted set: trim entries older than
+# the window, count, and record the request if it fits - one round trip.
+SLIDING_WINDOW = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now_ms - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count < limit then
+    redis.call('ZADD', KEYS[1], now_ms, ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return {1, limit - count - 1, 0}
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, 0, tonumber(oldest[2]) + window - now_ms}
+"""
+
+UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_limit(limit: str) -> tuple[int, float]:
+    """
+    Parse a limit such as ``5/minute`` or ``100/10 seconds``.
+
+    :param limit: Number of requests, a slash and a period.
+    :return: Number of requests and the window in seconds.
+    :raises ValueError: The limit is malformed.
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*", limit)
+    if match is None:
+        raise ValueError(f"Invalid rate limit: {limit!r}")
+    times, count, unit = match.groups()
+    return int(times), int(count or 1) * UNITS[unit]
+
+
+class TokenBucket:
+    """
+    In-process token buckets, one per key, used while Redis is unavailable.
+
+    Each bucket holds up to ``times`` tokens and refills at ``times / seconds``
+    per second, so the long-run rate matches the sliding window. Limits are
+    per worker process in this mode.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+
+    def hit(self, key: str, times: int, seconds: float) -> tuple[bool, int, float]:
+        """
+        Take a token from a bucket.
+
+        :param key: Bucket key.
+        :param times: Bucket capacity.
+        :param seconds: Time to refill the whole bucket.
+        :return: Whether the request is allowed, tokens left and seconds until the next token.
+        """
+        now = time.monotonic()
+        rate = times / seconds
+        tokens, updated = self._buckets.pop(key, (times, now))
+        tokens = min(times, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return allowed, int(tokens), 0.0 if allowed else (1 - tokens) / rate
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class RateLimiter:
+    """
+    Checks named limits from ``config.rate_limits`` against Redis, or against
+    in-process token buckets when Redis is not configured or fails.
+
+    After a Redis error the limiter stays on the fallback for
+    ``retry_after`` seconds, so an outage does not add a connection timeout
+    to every request.
+    """
+
+    PREFIX = "ratelimit:"
+
+    def __init__(self, limits: dict[str, str], redis=None, retry_after: float = 5):
+        self.limits = {name: parse_limit(limit) for name, limit in limits.items()}
+        self.redis = redis
+        self.retry_after = retry_after
+        self.fallback = TokenBucket()
+        self._script = None
+        self._script_redis = None
+        self._redis_down_until = 0.0
+
+    @property
+    def script(self):
+        if self._script is None or self._script_redis is not self.redis:
+            self._script = self.redis.register_script(SLIDING_WINDOW)
+            self._script_redis = self.redis
+        return self._script
+
+    async def hit(self, name: str, identity: str) -> tuple[bool, int, float]:
+        """
+        Count a request against a limit.
+
+        :param name: Name of the limit in ``limits``.
+        :param identity: Who is limited, e.g. the client address.
+        :return: Whether the request is allowed, requests left and seconds to wait when refused.
+        """
+        times, seconds = self.limits[name]
+        key = f"{self.PREFIX}{name}:{identity}"
+        if self.redis is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                allowed, remaining, wait_ms = await self.script(keys=[key],
+                                                                args=[int(seconds * 1000), times, uuid.uuid4().hex])
+                return bool(allowed), int(remaining), int(wait_ms) / 1000
+            except (RedisError, OSError) as err:
+                logger.warning("Rate limiting falls back to local buckets: %s", err)
+                self._redis_down_until = time.monotonic() + self.retry_after
+        return self.fallback.hit(key, times, seconds)
+
+    def reset(self):
+        """
+        Forget the local buckets and retry Redis on the next check.
+        """
+        self.fallback.clear()
+        self._redis_down_until = 0.0
+
+
+limiter = RateLimiter(config.rate_limits)
+
+
+def rate_limit(name: str):
+    """
+    Dependency enforcing the named limit per client address.
+
+    Usage: ``@router.post(..., dependencies=[Depends(rate_limit("login"))])``.
+
+    :param name: Name of the limit in ``config.rate_limits``.
+    :return: Dependency raising 429 with Retry-After when the limit is exceeded.
+    """
+    if name not in limiter.limits:
+        raise ValueError(f"No rate limit configured for {name!r}")
+
+    async def check(request: Request):
+        identity = request.client.host if request.client else "unknown"
+        allowed, _, wait = await limiter.hit(name, identity)
+        if not allowed:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many requests",
+                                headers={"Retry-After": str(max(1, math.ceil(wait)))})
+
+    return check
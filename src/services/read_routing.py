@@ -0,0 +1,118 @@
+"""
+Routing of read-only requests to read replicas.
+
+Read-only routes take their session from :func:`get_read_db`, which hands
+out a replica session unless no replica is configured or the user wrote
+within the last ``read_your_writes_seconds``: a replica may lag behind the
+primary, and users should see their own changes. Routes that change
+contacts take their session from :func:`get_write_db`, which records the
+write once the route succeeded, before the response is sent.
+"""
+import logging
+import time
+
+from fastapi import Depends
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import config
+from src.database import db as database
+from src.database.db import get_db
+from src.database.models import User
+from src.services.auth import auth_service
+from src.services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class RecentWrites:
+    """
+    Users who wrote within the last ``window`` seconds.
+
+    Kept in the worker process and, when configured, in Redis, so a read
+    that lands on another worker also sees the write. After a Redis error
+    only the worker's own record is used for ``retry_after`` seconds, so an
+    outage does not add a connection timeout to every read.
+    """
+
+    PREFIX = "wrote:"
+
+    def __init__(self, window: float, maxsize: int = 10000, retry_after: float = 5):
+        self.window = window
+        self.local = TTLCache(maxsize, window)
+        self.redis = None
+        self.retry_after = retry_after
+        self._redis_down_until = 0.0
+
+    def _redis_up(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, err: Exception):
+        logger.warning("Read-your-writes tracking falls back to this worker: %s", err)
+        self._redis_down_until = time.monotonic() + self.retry_after
+
+    async def mark(self, user_id: int):
+        """
+        Record that a user just wrote.
+
+        :param user_id: Identifier of the user.
+        """
+        self.local.set(user_id, True)
+        if self._redis_up():
+            try:
+                await self.redis.set(f"{self.PREFIX}{user_id}", 1, px=int(self.window * 1000))
+            except (RedisError, OSError) as err:
+                self._redis_failed(err)
+
+    async def recent(self, user_id: int) -> bool:
+        """
+        Whether a user wrote within the window.
+
+        :param user_id: Identifier of the user.
+        :return: True if the user's reads should go to the primary.
+        """
+        if self.local.get(user_id):
+            return True
+        if self._redis_up():
+            try:
+                return bool(await self.redis.exists(f"{self.PREFIX}{user_id}"))
+            except (RedisError, OSError) as err:
+                self._redis_failed(err)
+        return False
+
+    def clear(self):
+        """
+        Forget every write of this worker and retry Redis on the next call.
+        """
+        self.local.clear()
+        self._redis_down_until = 0.0
+
+
+recent_writes = RecentWrites(config.read_your_writes_seconds)
+
+
+async def get_read_db(db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Dependency: session of a read-only route, on a replica when possible.
+
+    :param db: Primary session of the request, used without replicas and right after the user's writes.
+    :param current_user: Current authenticated user.
+    :return: Replica or primary session.
+    """
+    if not database.ReplicaSessionLocals or await recent_writes.recent(current_user.id):
+        yield db
+        return
+    async with database.replica_session() as replica:
+        yield replica
+
+
+async def get_write_db(db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Dependency: primary session of a route that changes the user's contacts.
+
+    :param db: Primary session of the request.
+    :param current_user: Current authenticated user.
+    :return: Primary session.
+    """
+    yield db
+    await recent_writes.mark(current_user.id)
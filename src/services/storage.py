@@ -0,0 +1,107 @@
+import abc
+import asyncio
+import io
+from pathlib import Path
+
+from src.conf.config import config
+from src.services.avatars import EXTENSION
+
+AVATAR_URL = "/api/users/avatars/{name}"
+
+
+class AvatarStorage(abc.ABC):
+    """
+    Where rendered avatar thumbnails are kept.
+
+    ``save`` receives every variant of one upload and returns a URL per size.
+    Names include a content hash, so a new upload gets new URLs and the old
+    ones may be cached forever.
+    """
+
+    @abc.abstractmethod
+    async def save(self, owner: str, digest: str, variants: dict[int, bytes]) -> dict[int, str]:
+        """
+        Store the thumbnails of one upload.
+
+        :param owner: Stable identifier of the avatar owner.
+        :param digest: Content hash of the upload.
+        :param variants: Encoded thumbnail per size.
+        :return: URL per size.
+        """
+
+    def path(self, name: str) -> Path | None:
+        """
+        Local file behind an avatar URL, for backends the API serves itself.
+
+        :param name: File name from the URL.
+        :return: Path to the file, or None.
+        """
+        return None
+
+
+class LocalAvatarStorage(AvatarStorage):
+    """
+    Keeps thumbnails in a directory served by ``GET /api/users/avatars/{name}``.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def _write(self, owner: str, names: dict[int, str], variants: dict[int, bytes]):
+        self.root.mkdir(parents=True, exist_ok=True)
+        for size, name in names.items():
+            tmp = self.root / f".{name}"
+            tmp.write_bytes(variants[size])
+            tmp.replace(self.root / name)
+        keep = set(names.values())
+        for old in self.root.glob(f"{owner}-*.{EXTENSION}"):
+            if old.name not in keep:
+                old.unlink(missing_ok=True)
+
+    async def save(self, owner: str, digest: str, variants: dict[int, bytes]) -> dict[int, str]:
+        names = {size: f"{owner}-{digest}-{size}.{EXTENSION}" for size in variants}
+        await asyncio.to_thread(self._write, owner, names, variants)
+        return {size: AVATAR_URL.format(name=name) for size, name in names.items()}
+
+    def path(self, name: str) -> Path | None:
+        path = self.root / name
+        return path if path.is_file() else None
+
+
+class CloudinaryAvatarStorage(AvatarStorage):
+    """
+    Uploads the pre-rendered thumbnails to Cloudinary, which serves them from its CDN.
+    """
+
+    def __init__(self, cloud_name: str, api_key: str, api_secret: str, folder: str = "NotesApp"):
+        import cloudinary
+        import cloudinary.uploader
+
+        cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret, secure=True)
+        self.uploader = cloudinary.uploader
+        self.folder = folder
+
+    def _upload(self, owner: str, size: int, data: bytes) -> str:
+        result = self.uploader.upload(io.BytesIO(data), public_id=f"{self.folder}/{owner}_{size}",
+                                      overwrite=True, invalidate=True)
+        return result["secure_url"]
+
+    async def save(self, owner: str, digest: str, variants: dict[int, bytes]) -> dict[int, str]:
+        urls = await asyncio.gather(*(asyncio.to_thread(self._upload, owner, size, data)
+                                      for size, data in variants.items()))
+        return dict(zip(variants, urls))
+
+
+def get_avatar_storage() -> AvatarStorage:
+    """
+    Storage backend selected by ``avatar_storage`` in the settings.
+
+    :return: Local or Cloudinary storage.
+    """
+    if config.avatar_storage == "cloudinary":
+        return CloudinaryAvatarStorage(config.cloudinary_name, config.cloudinary_api_key,
+                                       config.cloudinary_api_secret)
+    return LocalAvatarStorage(config.avatar_dir)
+
+
+avatar_storage = get_avatar_storage()
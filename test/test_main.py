@@ -1,6 +1,11 @@
+import os
+import subprocess
+import sys
+
 from fastapi.testclient import TestClient
 
 import main
+from benchmarks.importtime import LAZY, ROOT
 
 client = TestClient(main.app)
 
@@ -8,4 +13,15 @@ client = TestClient(main.app)
 def test_read_main():
     response = client.get("/")
     assert response.status_code == 200
-    assert response.json() == {"message": "Hello World"}
\ No newline at end of file
+    assert response.json() == {"message": "Hello World"}
+
+def test_import_is_lazy(tmp_path):
+    # a fresh interpreter: no DDL against the database, no SDKs of single endpoints
+    database = tmp_path / "startup.db"
+    code = ("import sys, main; "
+            "print(','.join(sorted({name.split('.')[0] for name in sys.modules} & set(sys.argv[1:]))))")
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URL=f"sqlite:///{database}")
+    result = subprocess.run([sys.executable, "-c", code, *LAZY], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+    assert not database.exists()
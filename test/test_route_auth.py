@@ -1,9 +1,10 @@
 from unittest.mock import MagicMock
 
-from src.database.models import User
+from src.database.models import EmailMessage, User
+from src.services.ratelimit import limiter
 
 
-def test_create_user(client, user, monkeypatch):
+def test_create_user(client, session, user, monkeypatch):
     mock_send_email = MagicMock()
     monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
     response = client.post(
@@ -14,6 +15,9 @@ def test_create_user(client, user, monkeypatch):
     data = response.json()
     assert data["user"]["email"] == user.get("email")
     assert "id" in data["user"]
+    assert data["user"]["avatar"] is None
+    new_user = session.query(User).filter(User.email == user.get('email')).one()
+    assert new_user.avatar.startswith("https://www.gravatar.com/avatar/")
 
 
 def test_repeat_create_user(client, user):
@@ -36,6 +40,14 @@ def test_login_user_not_confirmed(client, user):
     assert data["detail"] == "Email not confirmed"
 
 
+def test_request_email_is_queued(client, session, user):
+    response = client.post("/api/auth/request_email", json={"email": user.get('email')})
+    assert response.status_code == 200, response.text
+    message = session.query(EmailMessage).filter(EmailMessage.recipient == user.get('email')).one()
+    assert message.status == "pending"
+    assert message.context["username"] == user.get('username')
+
+
 def test_login_user(client, session, user):
     current_user: User = session.query(User).filter(User.email == user.get('email')).first()
     current_user.confirmed = True
@@ -66,4 +78,13 @@ def test_login_wrong_email(client, user):
     )
     assert response.status_code == 401, response.text
     data = response.json()
-    assert data["detail"] == "Invalid email"
\ No newline at end of file
+    assert data["detail"] == "Invalid email"
+
+def test_signup_rate_limited(client, monkeypatch):
+    monkeypatch.setitem(limiter.limits, "signup", (1, 60))
+    limiter.reset()
+    client.post("/api/auth/signup", json={"username": "first", "email": "first@example.com", "password": "123456789"})
+    response = client.post("/api/auth/signup",
+                           json={"username": "second", "email": "second@example.com", "password": "123456789"})
+    assert response.status_code == 429, response.text
+    assert int(response.headers["retry-after"]) > 0
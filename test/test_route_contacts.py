@@ -0,0 +1,344 @@
+import gzip
+import json
+import shutil
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.database import db
+from src.database.models import Contact, User
+from src.services.read_routing import recent_writes
+
+
+CONTACTS = [
+    {"first_name": "John", "last_name": "Doe", "email": "john.doe@example.com",
+     "phone_number": "+380501112233", "birthday": "1990-05-17", "additional_data": "college friend"},
+    {"first_name": "Jane", "last_name": "Roe", "email": "jane@work.com",
+     "phone_number": "+380674445566", "birthday": "1985-12-30", "additional_data": None},
+    {"first_name": "Johnny", "last_name": "Walker", "email": "walker@example.com",
+     "phone_number": "+380939998877", "birthday": "2000-01-02", "additional_data": "neighbour"},
+]
+
+
+def test_create_contacts(client, headers):
+    for contact in CONTACTS:
+        response = client.post("/api/notes/", json=contact, headers=headers)
+        assert response.status_code == 200, response.text
+        assert response.json()["email"] == contact["email"]
+
+
+def test_email_unique_per_user(client, headers, session):
+    response = client.post("/api/notes/", json={**CONTACTS[0], "first_name": "Jon"}, headers=headers)
+    assert response.status_code == 409, response.text
+
+    # another user may keep a contact with the same email
+    other = User(username="other", email="other@example.com", password="x", confirmed=True)
+    session.add(other)
+    session.commit()
+    session.add(Contact(**{**CONTACTS[0], "birthday": date(1990, 5, 17)}, user_id=other.id))
+    session.commit()
+    assert client.get("/api/notes/search", params={"q": "john.doe"}, headers=headers).json()[0]["first_name"] == "John"
+
+
+def test_read_contacts_pages(client, headers):
+    response = client.get("/api/notes/", params={"limit": 2, "sort": "name"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert [c["last_name"] for c in response.json()] == ["Doe", "Roe"]
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get("/api/notes/", params={"limit": 2, "sort": "name", "after": cursor}, headers=headers)
+    assert [c["last_name"] for c in response.json()] == ["Walker"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_list_items_match_detail(client, headers):
+    # lists are encoded from plain rows, single contacts through the response model
+    response = client.get("/api/notes/", headers=headers)
+    assert response.headers["content-type"] == "application/json"
+    for contact in response.json():
+        assert client.get(f"/api/notes/{contact['id']}", headers=headers).json() == contact
+    assert response.json()[0] == {**CONTACTS[0], "id": response.json()[0]["id"]}
+
+
+def test_sparse_fieldsets(client, headers):
+    params = {"fields": "last_name,first_name, phone_number", "sort": "name", "limit": 2}
+    response = client.get("/api/notes/", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    page = response.json()
+    assert [set(contact) for contact in page] == [{"id", "first_name", "last_name", "phone_number"}] * 2
+    assert page[0] == {"id": page[0]["id"], "first_name": "John", "last_name": "Doe", "phone_number": "+380501112233"}
+    assert response.headers["etag"] != client.get("/api/notes/", params={"sort": "name", "limit": 2},
+                                                  headers=headers).headers["etag"]
+    # the cursor still carries the sort keys, which were read but not returned
+    response = client.get("/api/notes/", params={**params, "after": response.headers["X-Next-Cursor"]},
+                          headers=headers)
+    assert [contact["last_name"] for contact in response.json()] == ["Walker"]
+
+    response = client.get(f"/api/notes/{page[0]['id']}", params={"fields": "email"}, headers=headers)
+    assert response.json() == {"id": page[0]["id"], "email": "john.doe@example.com"}
+    etag = response.headers["etag"]
+    response = client.get(f"/api/notes/{page[0]['id']}", params={"fields": "email"},
+                          headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    response = client.get(f"/api/notes/{page[0]['id']}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert client.get("/api/notes/999999", params={"fields": "email"}, headers=headers).status_code == 404
+
+    response = client.get("/api/notes/search", params={"q": "john", "fields": "first_name"}, headers=headers)
+    assert sorted(contact["first_name"] for contact in response.json()) == ["John", "Johnny"]
+    assert all(set(contact) == {"id", "first_name"} for contact in response.json())
+
+
+def test_sparse_fieldsets_unknown_field(client, headers):
+    response = client.get("/api/notes/", params={"fields": "first_name,password"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: password"
+    assert client.get("/api/notes/", params={"fields": ","}, headers=headers).status_code == 400
+
+
+def test_read_contacts_invalid_cursor(client, headers):
+    response = client.get("/api/notes/", params={"after": "garbage"}, headers=headers)
+    assert response.status_code == 400, response.text
+
+
+def test_search_contacts(client, headers):
+    response = client.get("/api/notes/search", params={"q": "john"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert {c["first_name"] for c in response.json()} == {"John", "Johnny"}
+
+    response = client.get("/api/notes/search", params={"q": "example neighbour"}, headers=headers)
+    assert [c["last_name"] for c in response.json()] == ["Walker"]
+
+
+def test_search_follows_updates_and_deletes(client, headers):
+    contact_id = client.get("/api/notes/search", params={"q": "roe"}, headers=headers).json()[0]["id"]
+    client.put(f"/api/notes/{contact_id}", json={**CONTACTS[1], "last_name": "Smith"}, headers=headers)
+    assert client.get("/api/notes/search", params={"q": "roe"}, headers=headers).json() == []
+    assert len(client.get("/api/notes/search", params={"q": "smith"}, headers=headers).json()) == 1
+
+    client.delete(f"/api/notes/{contact_id}", headers=headers)
+    assert client.get("/api/notes/search", params={"q": "smith"}, headers=headers).json() == []
+
+
+def test_upcoming_birthdays(client, headers):
+    response = client.get("/api/notes/birthdays", params={"days": 366}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert {c["last_name"] for c in response.json()} == {"Doe", "Walker"}
+
+    response = client.get("/api/notes/birthdays", params={"days": 400}, headers=headers)
+    assert response.status_code == 422, response.text
+
+
+def test_contacts_by_phone(client, headers):
+    response = client.get("/api/notes/by-phone/050 111-22-33", headers=headers)
+    assert response.status_code == 200, response.text
+    assert [contact["email"] for contact in response.json()] == ["john.doe@example.com"]
+    response = client.get("/api/notes/by-phone/380939998877", params={"fields": "first_name"}, headers=headers)
+    walker = response.json()
+    assert walker == [{"id": walker[0]["id"], "first_name": "Johnny"}]
+
+    client.put(f"/api/notes/{walker[0]['id']}", json={**CONTACTS[2], "phone_number": "093 000 00 01"}, headers=headers)
+    assert client.get("/api/notes/by-phone/+380939998877", headers=headers).json() == []
+    assert len(client.get("/api/notes/by-phone/+380930000001", headers=headers).json()) == 1
+    client.put(f"/api/notes/{walker[0]['id']}", json=CONTACTS[2], headers=headers)
+    assert client.get("/api/notes/by-phone/12", headers=headers).status_code == 400
+
+
+def test_import_contacts(client, headers):
+    csv_body = (
+        "first_name,last_name,email,phone_number,birthday,additional_data\n"
+        "Ann,Lee,ann@example.com,+380501000001,1991-03-04,\n"
+        "Bob,Kay,bob@example.com,+380501000002,not-a-date,\n"
+        "Cid,Ray,john.doe@example.com,+380501000003,1992-04-05,duplicate email\n"
+        "Dan,Fox,dan@example.com,+380501000004,1993-05-06,\n"
+    )
+    response = client.post("/api/notes/import", params={"batch_size": 2}, headers=headers,
+                           files={"file": ("contacts.csv", csv_body, "text/csv")})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["inserted"] == 2
+    assert [error["row"] for error in data["errors"]] == [2, 3]
+    assert data["errors"][1]["detail"] == "Contact with this email already exists"
+
+    jsonl_body = '{"first_name": "Eve", "last_name": "Moss", "email": "eve@example.com", ' \
+                 '"phone_number": "+380501000005", "birthday": "1994-06-07"}\n{broken\n'
+    response = client.post("/api/notes/import", headers=headers,
+                           files={"file": ("contacts.jsonl", jsonl_body, "application/x-ndjson")})
+    data = response.json()
+    assert data["inserted"] == 1
+    assert data["failed"] == 1
+    assert len(client.get("/api/notes/search", params={"q": "eve"}, headers=headers).json()) == 1
+
+
+def test_export_contacts(client, headers):
+    response = client.get("/api/notes/export", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert {row["email"] for row in rows} >= {"john.doe@example.com", "eve@example.com"}
+    assert rows == sorted(rows, key=lambda row: row["id"])
+
+    response = client.get("/api/notes/export", params={"format": "csv", "gzip": True}, headers=headers)
+    assert response.status_code == 200, response.text
+    lines = gzip.decompress(response.content).decode().splitlines()
+    assert lines[0] == "id,first_name,last_name,email,phone_number,birthday,additional_data"
+    assert len(lines) == len(rows) + 1
+
+
+def test_bulk_update_and_delete(client, headers):
+    ids = [c["id"] for c in client.get("/api/notes/search", params={"q": "example"}, headers=headers).json()]
+    response = client.patch("/api/notes/bulk", headers=headers,
+                            json={"ids": ids + [999999], "values": {"additional_data": "bulk"}})
+    assert response.status_code == 200, response.text
+    assert response.json()["ids"] == sorted(ids)
+    assert len(client.get("/api/notes/search", params={"q": "bulk"}, headers=headers).json()) == len(ids)
+
+    response = client.patch("/api/notes/bulk", headers=headers, json={"values": {"last_name": "X"}})
+    assert response.status_code == 422, response.text
+
+    response = client.request("DELETE", "/api/notes/bulk", headers=headers,
+                              json={"filter": {"last_name": "Walker"}})
+    assert response.status_code == 200, response.text
+    assert len(response.json()["ids"]) == 1
+    assert client.get("/api/notes/search", params={"q": "walker"}, headers=headers).json() == []
+
+
+def test_bulk_update_rejects_nulls(client, headers):
+    ids = [contact["id"] for contact in client.get("/api/notes/", headers=headers).json()]
+    response = client.patch("/api/notes/bulk", json={"ids": ids, "values": {"first_name": None, "birthday": None}},
+                            headers=headers)
+    assert response.status_code == 422, response.text
+    assert "first_name" in response.text and "birthday" in response.text
+    response = client.patch("/api/notes/bulk", json={"ids": ids[:1], "values": {"additional_data": None}},
+                            headers=headers)
+    assert response.status_code == 200, response.text
+    assert client.get("/api/notes/", headers=headers).status_code == 200
+
+
+def test_contacts_etag(client, headers, monkeypatch):
+    response = client.get("/api/notes/", params={"limit": 2}, headers=headers)
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    get_contacts = MagicMock()
+    monkeypatch.setattr("src.repository.contacts.get_contacts", get_contacts)
+    response = client.get("/api/notes/", params={"limit": 2}, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    get_contacts.assert_not_called()
+    monkeypatch.undo()
+
+    other = client.get("/api/notes/", params={"limit": 3}, headers=headers).headers["etag"]
+    assert other != etag
+    contact_id = client.get("/api/notes/", params={"limit": 1}, headers=headers).json()[0]["id"]
+    client.patch("/api/notes/bulk", headers=headers, json={"ids": [contact_id], "values": {"additional_data": "etag"}})
+    response = client.get("/api/notes/", params={"limit": 2}, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_contact_etag(client, headers, monkeypatch):
+    contact = client.post("/api/notes/", headers=headers, json={**CONTACTS[0], "email": "etag@example.com"})
+    etag = contact.headers["etag"]
+    contact_id = contact.json()["id"]
+    response = client.get(f"/api/notes/{contact_id}", headers=headers)
+    assert response.headers["etag"] == etag
+
+    get_contact_by_id = MagicMock()
+    monkeypatch.setattr("src.repository.contacts.get_contact_by_id", get_contact_by_id)
+    response = client.get(f"/api/notes/{contact_id}", headers={**headers, "If-None-Match": f'"stale", W/{etag}'})
+    assert response.status_code == 304
+    get_contact_by_id.assert_not_called()
+    monkeypatch.undo()
+
+    updated = client.put(f"/api/notes/{contact_id}", headers=headers,
+                         json={**CONTACTS[0], "email": "etag@example.com", "first_name": "Jon"})
+    assert updated.headers["etag"] != etag
+    response = client.get(f"/api/notes/{contact_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Jon"
+    assert response.headers["etag"] == updated.headers["etag"]
+
+    client.delete(f"/api/notes/{contact_id}", headers=headers)
+    response = client.get(f"/api/notes/{contact_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 404
+
+
+def test_find_and_merge_duplicates(client, headers):
+    original = client.get("/api/notes/search", params={"q": "john doe"}, headers=headers).json()[0]
+    duplicate = client.post("/api/notes/", headers=headers, json={
+        "first_name": "Jon", "last_name": "Doe", "email": "John.Doe+home@example.com",
+        "phone_number": "050 111 22 33", "birthday": "1990-05-17", "additional_data": "gym"}).json()
+
+    response = client.get("/api/notes/duplicates", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == [{"ids": [original["id"], duplicate["id"]], "score": 1.0,
+                                "reasons": ["email", "phone", "name", "birthday"]}]
+
+    response = client.post("/api/notes/merge", headers=headers,
+                           json={"groups": [{"target_id": original["id"], "ids": [duplicate["id"], 999999]}]})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Contacts not found: 999999"
+    response = client.post("/api/notes/merge", headers=headers,
+                           json={"groups": [{"target_id": original["id"], "ids": [original["id"]]}]})
+    assert response.status_code == 422
+
+    response = client.post("/api/notes/merge", headers=headers,
+                           json={"groups": [{"target_id": original["id"], "ids": [duplicate["id"]]}]})
+    assert response.status_code == 200, response.text
+    assert response.json() == {"merged": [original["id"]], "deleted": [duplicate["id"]]}
+    assert client.get(f"/api/notes/{duplicate['id']}", headers=headers).status_code == 404
+    merged = client.get(f"/api/notes/{original['id']}", headers=headers).json()
+    assert merged == {**original, "additional_data": f"{original['additional_data']}\ngym"}
+    assert client.get("/api/notes/duplicates", headers=headers).json() == []
+
+
+def test_duplicates_job(client, headers, monkeypatch):
+    for email in ("mary.major@example.com", "m.major@work.com"):
+        client.post("/api/notes/", headers=headers, json={"first_name": "Mary", "last_name": "Major", "email": email,
+                                                          "phone_number": "+380971234567", "birthday": "1979-03-08"})
+    monkeypatch.setattr("src.routes.contacts.config.duplicates_sync_limit", 0)
+    response = client.get("/api/notes/duplicates", headers=headers)
+    assert response.status_code == 202, response.text
+    assert response.json()["status"] == "pending"
+    # TestClient runs the background task before returning the response
+    job = client.get(response.headers["location"], headers=headers).json()
+    assert job["status"] == "done"
+    assert job["done"] == job["total"] > 0
+    assert [pair["reasons"] for pair in job["result"]["pairs"]] == [["phone", "name", "birthday"]]
+    assert job["result"]["contacts"] >= 4
+    assert client.get("/api/notes/jobs/999999", headers=headers).status_code == 404
+
+
+def test_reads_go_to_replica(client, headers, monkeypatch, tmp_path):
+    # a copy of the primary stands for a replica that stopped replicating here
+    shutil.copyfile("test.db", tmp_path / "replica.db")
+    replica = create_async_engine(db.to_async_url(f"sqlite:///{tmp_path / 'replica.db'}"), poolclass=NullPool)
+    monkeypatch.setattr(db, "ReplicaSessionLocals", [async_sessionmaker(replica, expire_on_commit=False)])
+    recent_writes.clear()
+
+    def listed_ids():
+        return [contact["id"] for contact in client.get("/api/notes/", headers=headers).json()]
+
+    before = listed_ids()
+    created = client.post("/api/notes/", headers=headers, json={
+        "first_name": "Rita", "last_name": "Replica", "email": "rita@example.com",
+        "phone_number": "+380631112233", "birthday": "1992-04-04", "additional_data": None}).json()
+    # the user's own write is read back from the primary
+    assert listed_ids() == before + [created["id"]]
+    assert client.get(f"/api/notes/{created['id']}", headers=headers).status_code == 200
+
+    # once the window is over, reads go to the replica, which has not seen the write
+    recent_writes.clear()
+    assert listed_ids() == before
+    assert client.get(f"/api/notes/{created['id']}", headers=headers).status_code == 404
+    assert client.delete(f"/api/notes/{created['id']}", headers=headers).status_code == 200
+
+
+def test_current_user_is_cached(client):
+    stats = client.get("/api/stats/user_cache").json()
+    assert stats["misses"] == 1
+    assert stats["hits"] > 10
@@ -0,0 +1,60 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from src.services.metrics import InstrumentedRedis, instrument_pool
+
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover
+    fakeredis = None
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_request_and_query_metrics(client, user):
+    before = sample("http_request_duration_seconds_count", method="POST", route="/api/auth/signup", status="201")
+    queries_before = sample("db_queries_per_request_sum", route="/api/auth/signup")
+    response = client.post("/api/auth/signup", json=user)
+    assert response.status_code == 201, response.text
+    client.get("/api/no/such/path")
+
+    assert sample("http_request_duration_seconds_count", method="POST", route="/api/auth/signup",
+                  status="201") == before + 1
+    assert sample("db_queries_per_request_sum", route="/api/auth/signup") > queries_before
+    assert sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") >= 1
+    assert sample("http_requests_in_flight", method="POST") == 0
+    assert sample("db_query_duration_seconds_count") > 0
+
+
+def test_metrics_endpoint(client, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=3)
+    collector = instrument_pool(engine, "test")
+    checkouts = sample("db_pool_checkout_wait_seconds_count")
+    connection = engine.connect()
+    try:
+        assert sample("db_pool_checkout_wait_seconds_count") == checkouts + 1
+        response = client.get("/metrics")
+    finally:
+        connection.close()
+        REGISTRY.unregister(collector)
+        engine.dispose()
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'db_pool_size{engine="test"} 3.0' in body
+    assert 'db_pool_checked_out{engine="test"} 1.0' in body
+    assert 'http_request_duration_seconds_bucket{le="0.005",method="POST",route="/api/auth/signup",status="201"}' in body
+
+
+@pytest.mark.skipif(fakeredis is None, reason="fakeredis is not installed")
+@pytest.mark.asyncio
+async def test_redis_latency():
+    before = sample("redis_command_duration_seconds_count", command="SET")
+    client = InstrumentedRedis(connection_pool=fakeredis.FakeAsyncRedis().connection_pool)
+    await client.set("key", "value")
+    assert await client.get("key") == b"value"
+    assert sample("redis_command_duration_seconds_count", command="SET") == before + 1
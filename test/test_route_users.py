@@ -0,0 +1,66 @@
+import io
+
+import pytest
+from PIL import Image
+
+from src.conf.config import config
+from src.services.storage import avatar_storage
+
+
+@pytest.fixture(autouse=True)
+def storage_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(avatar_storage, "root", tmp_path)
+    return tmp_path
+
+
+def image(color: str, size=(400, 300), fmt="PNG") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def upload(client, headers, data: bytes):
+    return client.patch("/api/users/avatar", files={"file": ("avatar.png", data, "image/png")}, headers=headers)
+
+
+def test_upload_avatar(client, headers, storage_root):
+    response = upload(client, headers, image("red"))
+    assert response.status_code == 200, response.text
+    avatar = response.json()["avatar"]
+    assert avatar.startswith("/api/users/avatars/") and avatar.endswith("-250.webp")
+    assert sorted(path.name.rsplit("-", 1)[1] for path in storage_root.iterdir()) == \
+        ["128.webp", "250.webp", "64.webp"]
+
+    response = client.get(avatar)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "image/webp"
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert Image.open(io.BytesIO(response.content)).size == (250, 250)
+
+    response = client.get("/api/users/me/", headers=headers)
+    assert response.json()["avatar"] == avatar
+
+
+def test_new_upload_replaces_variants(client, headers, storage_root):
+    first = upload(client, headers, image("red")).json()["avatar"]
+    second = upload(client, headers, image("blue")).json()["avatar"]
+    assert first != second
+    assert client.get(first).status_code == 404
+    assert client.get(second).status_code == 200
+    assert len(list(storage_root.iterdir())) == 3
+
+
+def test_avatar_too_large(client, headers, monkeypatch):
+    monkeypatch.setattr(config, "avatar_max_bytes", 100)
+    response = upload(client, headers, image("red"))
+    assert response.status_code == 413, response.text
+
+
+def test_avatar_not_an_image(client, headers):
+    response = upload(client, headers, b"not an image")
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"] == "File is not a supported image"
+
+
+def test_avatar_name_checked(client):
+    assert client.get("/api/users/avatars/.env").status_code == 422
@@ -0,0 +1,47 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fastapi import HTTPException
+from jose import JWTError, jwt
+
+from src.services.auth import Auth
+
+
+class TestTokenCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.auth = Auth()
+        self.auth.token_cache.clear()
+
+    async def test_signature_checked_once(self):
+        token = await self.auth.create_access_token(data={"sub": "deadpool@example.com"})
+        with patch("src.services.auth.jwt.decode", wraps=jwt.decode) as decode:
+            self.auth.decode_token(token)
+            payload = self.auth.decode_token(token)
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(payload["sub"], "deadpool@example.com")
+
+    async def test_expired_token_is_not_cached(self):
+        token = await self.auth.create_access_token(data={"sub": "deadpool@example.com"}, expires_delta=-1)
+        with self.assertRaises(JWTError):
+            self.auth.decode_token(token)
+        self.assertEqual(len(self.auth.token_cache), 0)
+
+    async def test_cached_token_expires_with_exp(self):
+        token = await self.auth.create_access_token(data={"sub": "deadpool@example.com"}, expires_delta=60)
+        self.auth.decode_token(token)
+        with patch("src.services.cache.time.monotonic", return_value=float("inf")):
+            with self.assertRaises(JWTError):
+                with patch("src.services.auth.jwt.decode", side_effect=JWTError("expired")):
+                    self.auth.decode_token(token)
+
+    async def test_scope_still_enforced(self):
+        token = await self.auth.create_refresh_token(data={"sub": "deadpool@example.com"})
+        self.assertEqual(await self.auth.decode_refresh_token(token), "deadpool@example.com")
+        with self.assertRaises(HTTPException) as e:
+            await self.auth.get_current_user(token=token, db=AsyncMock())
+        self.assertEqual(e.exception.status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+from src.database.models import User
+from src.services.cache import TTLCache, UserCache
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+    def test_expiry(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        with patch("src.services.cache.time.monotonic", return_value=100):
+            cache.set("a", 1)
+        with patch("src.services.cache.time.monotonic", return_value=161):
+            self.assertIsNone(cache.get("a"))
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.cache = UserCache(maxsize=10, ttl=60, redis_ttl=60)
+        self.user = User(id=1, username="deadpool", email="deadpool@example.com", password="hash",
+                         refresh_token="token", created_at=datetime(2024, 4, 1, 12, 0), avatar=None, confirmed=True)
+
+    async def test_hit_miss_and_invalidate(self):
+        self.assertIsNone(await self.cache.get(self.user.email))
+        await self.cache.set(self.user)
+        cached = await self.cache.get(self.user.email)
+        self.assertEqual(cached.id, self.user.id)
+        self.assertIsNone(cached.password)
+        await self.cache.invalidate(self.user.email)
+        self.assertIsNone(await self.cache.get(self.user.email))
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 2)
+
+    async def test_redis_tier(self):
+        store = {}
+        redis = AsyncMock()
+        redis.set.side_effect = lambda key, value, ex: store.__setitem__(key, value)
+        redis.get.side_effect = lambda key: store.get(key)
+        self.cache.redis = redis
+        await self.cache.set(self.user)
+        self.cache.local.clear()
+        cached = await self.cache.get(self.user.email)
+        self.assertEqual(cached.created_at, self.user.created_at)
+        await self.cache.invalidate(self.user.email)
+        redis.delete.assert_awaited_once_with("user:deadpool@example.com")
+
+    async def test_redis_outage_backs_off(self):
+        redis = AsyncMock()
+        redis.get.side_effect = redis.set.side_effect = ConnectionError("connection refused")
+        self.cache.redis = redis
+        with patch("src.services.cache.time.monotonic", return_value=100.0), \
+                self.assertLogs("src.services.cache", "WARNING"):
+            self.assertIsNone(await self.cache.get(self.user.email))
+            await self.cache.set(self.user)
+            self.assertEqual((await self.cache.get(self.user.email)).id, self.user.id)
+        self.assertEqual(redis.get.await_count, 1)
+        redis.set.assert_not_awaited()
+        # retried once the back-off is over
+        with patch("src.services.cache.time.monotonic", return_value=105.0), \
+                self.assertLogs("src.services.cache", "WARNING"):
+            await self.cache.set(self.user)
+        redis.set.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from datetime import date
+from types import SimpleNamespace
+
+from src.database.models import Contact
+from src.repository.contacts import merged_values
+from src.services.duplicates import (candidate_pairs, detect_duplicates, email_key, fingerprint, phone_key, score,
+                                     soundex)
+
+
+def row(id, first_name, last_name, email=None, phone_number=None, birthday=None):
+    return SimpleNamespace(id=id, first_name=first_name, last_name=last_name, email=email,
+                           phone_number=phone_number, birthday=birthday)
+
+
+class TestKeys(unittest.TestCase):
+
+    def test_soundex(self):
+        for name, code in [("Robert", "R163"), ("Rupert", "R163"), ("Ashcraft", "A261"), ("Tymczak", "T522"),
+                           ("Pfister", "P236"), ("Lee", "L000"), ("Zoë", "Z000")]:
+            self.assertEqual(soundex(name), code, name)
+        self.assertEqual(soundex("Олена"), "олена")
+        self.assertIsNone(soundex(" "))
+
+    def test_email_key(self):
+        self.assertEqual(email_key(" John.Doe+work@Example.com"), "john.doe@example.com")
+        self.assertEqual(email_key("j.o.h.n+x@googlemail.com"), email_key("john@gmail.com"))
+        self.assertIsNone(email_key("not-an-email"))
+
+    def test_phone_key(self):
+        self.assertEqual(phone_key("+38 (050) 111-22-33"), phone_key("0501112233"))
+        self.assertIsNone(phone_key("112"))
+
+
+class TestDetection(unittest.IsolatedAsyncioTestCase):
+
+    def test_candidate_pairs_skip_large_blocks(self):
+        fingerprints = [fingerprint(row(i, "John", "Smith")) for i in range(1, 6)]
+        self.assertEqual(len(candidate_pairs(fingerprints, max_block=5)), 10)
+        self.assertEqual(candidate_pairs(fingerprints, max_block=4), [])
+
+    def test_score(self):
+        a = fingerprint(row(1, "John", "Doe", "john.doe@example.com", "+380501112233", date(1990, 5, 17)))
+        b = fingerprint(row(2, "Doe", "Jon", "John.Doe+home@example.com", "050 111 22 33", date(1990, 5, 17)))
+        value, reasons = score(a, b)
+        self.assertEqual(value, 1.0)
+        self.assertEqual(reasons, ["email", "phone", "name", "birthday"])
+        c = fingerprint(row(3, "John", "Doe", birthday=date(1985, 1, 1)))
+        value, reasons = score(a, c)
+        self.assertEqual(reasons, ["name"])
+        self.assertLess(value, 0.5)
+
+    async def test_detect_duplicates(self):
+        rows = [
+            row(1, "John", "Doe", "john.doe@example.com", "+380501112233"),
+            row(2, "Jon", "Doe", "jdoe@work.com", "0501112233"),
+            row(3, "Jane", "Roe", "jane@example.com", "+380674445566"),
+            row(4, "Johnny", "Walker", "walker@example.com", "+380939998877"),
+            row(5, "Jane", "Roe", "jane.roe@gmail.com", "+380671234567", date(1985, 12, 30)),
+        ]
+        progress = []
+
+        async def report(done, total):
+            progress.append((done, total))
+
+        pairs = await detect_duplicates(rows, 0.5, 100, report, chunk_size=1)
+        self.assertEqual([pair["ids"] for pair in pairs], [[1, 2]])
+        self.assertEqual(pairs[0]["reasons"], ["phone", "name"])
+        self.assertEqual(progress[0][0], 0)
+        self.assertEqual(progress[-1][0], progress[-1][1])
+
+
+class TestMergedValues(unittest.TestCase):
+
+    def test_fills_empty_fields_and_joins_notes(self):
+        target = Contact(first_name="John", last_name="Doe", email="john@example.com", phone_number="",
+                         birthday=None, additional_data="friend")
+        sources = [Contact(first_name="Jon", phone_number="+380501112233", birthday=date(1990, 5, 17),
+                           additional_data="college"),
+                   Contact(phone_number="+380000000000", additional_data="friend")]
+        self.assertEqual(merged_values(target, sources), {"phone_number": "+380501112233",
+                                                          "birthday": date(1990, 5, 17),
+                                                          "additional_data": "friend\ncollege"})
+
+    def test_nothing_to_change(self):
+        target = Contact(first_name="John", last_name="Doe", email="john@example.com", phone_number="1",
+                         birthday=date(1990, 5, 17))
+        self.assertEqual(merged_values(target, [Contact(first_name="Jon")]), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import asyncio
+import os
+import socket
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.database.models import Base, EmailMessage
+from src.services.email import send_email
+from src.services.email_worker import EmailWorker, SMTPPool, retry_delay
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:  # pragma: no cover
+    Controller = None
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Sink:
+    def __init__(self):
+        self.envelopes = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        return "250 OK"
+
+
+@unittest.skipIf(Controller is None, "aiosmtpd is not installed")
+class TestEmailWorker(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{self.path}")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.sink = Sink()
+        self.controller = Controller(self.sink, hostname="127.0.0.1", port=free_port())
+        self.controller.start()
+
+    async def asyncTearDown(self):
+        self.controller.stop()
+        await self.engine.dispose()
+        os.remove(self.path)
+
+    def worker(self, port: int, **kwargs) -> EmailWorker:
+        pool = SMTPPool(1, hostname="127.0.0.1", port=port, use_tls=False, start_tls=False)
+        return EmailWorker(self.session_factory, pool, "Contacts <noreply@example.com>", **kwargs)
+
+    async def queue(self, count: int):
+        async with self.session_factory() as db:
+            for i in range(count):
+                await send_email(f"user{i}@example.com", f"user{i}", "http://testserver/", db)
+
+    async def outbox(self) -> list[EmailMessage]:
+        async with self.session_factory() as db:
+            return (await db.execute(select(EmailMessage).order_by(EmailMessage.id))).scalars().all()
+
+    async def test_batch_over_one_connection(self):
+        await self.queue(5)
+        worker = self.worker(self.controller.port)
+        stats = await worker.drain()
+        await worker.pool.close()
+        self.assertEqual((stats["sent"], stats["failed"]), (5, 0))
+        self.assertEqual(worker.pool.connects, 1)
+        self.assertEqual(len(self.sink.envelopes), 5)
+        body = self.sink.envelopes[0].content.decode()
+        self.assertIn("Hi user0,", body)
+        self.assertIn("http://testserver/api/auth/confirmed_email/", body)
+        self.assertTrue(all(message.status == "sent" for message in await self.outbox()))
+
+    async def test_failed_delivery_backs_off(self):
+        await self.queue(1)
+        worker = self.worker(free_port(), max_attempts=2, retry_base=30)
+        stats = await worker.drain()
+        self.assertEqual((stats["sent"], stats["failed"]), (0, 1))
+        [message] = await self.outbox()
+        self.assertEqual((message.status, message.attempts), ("pending", 1))
+        self.assertGreater(message.next_attempt_at, datetime.utcnow() + timedelta(seconds=20))
+        self.assertIsNotNone(message.last_error)
+
+        async with self.session_factory() as db:
+            message.next_attempt_at = datetime.utcnow()
+            await db.merge(message)
+            await db.commit()
+        await worker.drain()
+        [message] = await self.outbox()
+        self.assertEqual((message.status, message.attempts), ("failed", 2))
+
+    async def test_message_that_fails_to_render(self):
+        await self.queue(2)
+        async with self.session_factory() as db:
+            broken = await db.get(EmailMessage, 1)
+            broken.template = "missing_template.html"
+            await db.commit()
+        worker = self.worker(self.controller.port, max_attempts=5)
+        with self.assertLogs("src.services.email_worker", "ERROR"):
+            stats = await worker.drain()
+        await worker.pool.close()
+        self.assertEqual((stats["sent"], stats["failed"]), (1, 1))
+        broken, delivered = await self.outbox()
+        # not retried: rendering would fail again
+        self.assertEqual((broken.status, broken.attempts), ("failed", 1))
+        self.assertIn("TemplateNotFound", broken.last_error)
+        self.assertEqual(delivered.status, "sent")
+        self.assertEqual(len(self.sink.envelopes), 1)
+
+    async def test_run_survives_a_failed_batch(self):
+        await self.queue(1)
+        worker = self.worker(self.controller.port)
+        stop = asyncio.Event()
+        drain, calls = worker.drain, []
+
+        async def flaky_drain():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("database is locked")
+            stop.set()
+            return await drain()
+
+        worker.drain = flaky_drain
+        with self.assertLogs("src.services.email_worker", "ERROR"):
+            await asyncio.wait_for(worker.run(0.01, stop), 5)
+        await worker.pool.close()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual([message.status for message in await self.outbox()], ["sent"])
+
+    async def test_claim_leases_messages(self):
+        await self.queue(3)
+        worker = self.worker(self.controller.port, batch_size=2)
+        self.assertEqual(len(await worker.claim()), 2)
+        self.assertEqual(len(await worker.claim()), 1)
+        self.assertEqual(await worker.claim(), [])
+
+    def test_retry_delay(self):
+        self.assertEqual(retry_delay(1, 30), timedelta(seconds=30))
+        self.assertEqual(retry_delay(3, 30), timedelta(seconds=120))
+        self.assertEqual(retry_delay(20, 30), timedelta(hours=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
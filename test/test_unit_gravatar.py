@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.database.models import Base, User
+from src.services.gravatar import avatar_cache, gravatar_url, resolve_avatars
+
+
+class TestGravatarUrl(unittest.TestCase):
+
+    def setUp(self):
+        avatar_cache.clear()
+
+    def test_memoized_by_normalized_email(self):
+        with patch("src.services.gravatar.Gravatar") as gravatar:
+            gravatar.return_value.get_image.return_value = "https://www.gravatar.com/avatar/x"
+            self.assertEqual(gravatar_url("Deadpool@Example.com"), "https://www.gravatar.com/avatar/x")
+            self.assertEqual(gravatar_url(" deadpool@example.com"), "https://www.gravatar.com/avatar/x")
+        gravatar.assert_called_once()
+        self.assertEqual(avatar_cache.get("deadpool@example.com"), "https://www.gravatar.com/avatar/x")
+
+    def test_failure_is_not_cached(self):
+        with patch("src.services.gravatar.Gravatar", side_effect=ValueError("bad email")):
+            self.assertIsNone(gravatar_url("deadpool@example.com"))
+        self.assertEqual(len(avatar_cache), 0)
+
+
+class TestResolveAvatars(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        avatar_cache.clear()
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{self.path}")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+        async with self.session_factory() as db:
+            db.add_all([User(username=f"user{i}", email=f"user{i}@example.com", password="x") for i in range(5)])
+            db.add(User(username="uploaded", email="uploaded@example.com", password="x", avatar="/mine.webp"))
+            await db.commit()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        os.remove(self.path)
+
+    async def avatars(self) -> dict:
+        async with self.session_factory() as db:
+            return dict((await db.execute(select(User.username, User.avatar))).all())
+
+    async def test_selected_users(self):
+        self.assertEqual(await resolve_avatars(self.engine, [1, 2, 6]), 2)
+        avatars = await self.avatars()
+        self.assertTrue(avatars["user0"].startswith("https://www.gravatar.com/avatar/"))
+        self.assertIsNone(avatars["user2"])
+        self.assertEqual(avatars["uploaded"], "/mine.webp")
+
+    async def test_all_missing_in_batches(self):
+        self.assertEqual(await resolve_avatars(self.engine, batch_size=2), 5)
+        self.assertTrue(all(await self.avatars()))
+        self.assertEqual(await resolve_avatars(self.engine), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
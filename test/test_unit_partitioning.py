@@ -0,0 +1,37 @@
+import unittest
+
+from src.database import fts
+from src.database.models import Contact
+from src.database.partitioning import COLUMNS, INDEXES, rebuild
+
+
+class TestPartitioning(unittest.TestCase):
+
+    def test_columns_match_model(self):
+        self.assertEqual(set(COLUMNS), {column.name for column in Contact.__table__.columns})
+
+    def test_indexes_match_model(self):
+        names = {statement.split(" ON ")[0].split()[-1] for statement in INDEXES}
+        self.assertEqual(names, {index.name for index in Contact.__table__.indexes})
+
+    def test_hash_partitions(self):
+        statements = rebuild(4)
+        self.assertIn("CREATE TABLE contacts (LIKE contacts_old INCLUDING DEFAULTS INCLUDING GENERATED) "
+                      "PARTITION BY HASH (user_id)", statements)
+        self.assertIn("ALTER TABLE contacts ADD CONSTRAINT contacts_pkey PRIMARY KEY (user_id, id)", statements)
+        partitions = [statement for statement in statements if "PARTITION OF" in statement]
+        self.assertEqual(partitions[-1], "CREATE TABLE contacts_p3 PARTITION OF contacts "
+                                         "FOR VALUES WITH (MODULUS 4, REMAINDER 3)")
+        self.assertEqual(len(partitions), 4)
+        # rows are copied before the old table goes, indexes are built after
+        self.assertLess(statements.index("DROP TABLE contacts_old"), statements.index(INDEXES[0]))
+        self.assertIn(fts.POSTGRES_CREATE[-1], statements)
+
+    def test_plain_table(self):
+        statements = rebuild()
+        self.assertNotIn("PARTITION", " ".join(statements))
+        self.assertIn("ALTER TABLE contacts ADD CONSTRAINT contacts_pkey PRIMARY KEY (id)", statements)
+
+
+if __name__ == '__main__':
+    unittest.main()
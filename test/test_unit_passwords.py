@@ -0,0 +1,39 @@
+import asyncio
+import threading
+import unittest
+
+from fastapi import HTTPException
+
+from src.services.passwords import PasswordPool, hash_password, verify_password
+
+
+class TestPasswordPool(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.pool = PasswordPool("thread", workers=2, max_pending=2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    async def test_hash_and_verify_off_loop(self):
+        hashed = await self.pool.run(hash_password, "secret")
+        self.assertTrue(await self.pool.run(verify_password, "secret", hashed))
+        self.assertFalse(await self.pool.run(verify_password, "wrong", hashed))
+        thread = await self.pool.run(lambda: threading.current_thread().name)
+        self.assertTrue(thread.startswith("password"))
+
+    async def test_rejects_when_full(self):
+        release = threading.Event()
+        running = [asyncio.create_task(self.pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        self.assertEqual(self.pool.stats()["in_flight"], 2)
+        with self.assertRaises(HTTPException) as e:
+            await self.pool.run(release.wait)
+        self.assertEqual(e.exception.status_code, 503)
+        release.set()
+        await asyncio.gather(*running)
+        self.assertEqual(self.pool.stats(), {"workers": 2, "in_flight": 0, "queued": 0, "rejected": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from src.database.db import QueryStats, request_queries
+from src.services.metrics import MetricsMiddleware
+from src.services.query_budget import QueryBudgetExceeded, query_budget
+
+
+class TestQueryAudit(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE contacts (id INTEGER PRIMARY KEY, user_id INTEGER)"))
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def run_queries(self, times: int):
+        with self.engine.connect() as conn:
+            for user_id in range(times):
+                conn.execute(text("SELECT id FROM contacts WHERE user_id = :user_id"), {"user_id": user_id})
+
+    def test_n_plus_one(self):
+        stats = QueryStats()
+        token = request_queries.set(stats)
+        try:
+            with self.assertLogs("src.database.db", "WARNING") as logs:
+                self.run_queries(6)
+        finally:
+            request_queries.reset(token)
+        self.assertEqual(stats.count, 6)
+        self.assertEqual(stats.repeated, ["SELECT id FROM contacts WHERE user_id = ?"])
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("Possible N+1", logs.output[0])
+
+    def test_no_n_plus_one_below_threshold(self):
+        stats = QueryStats()
+        token = request_queries.set(stats)
+        try:
+            self.run_queries(4)
+        finally:
+            request_queries.reset(token)
+        self.assertEqual(stats.repeated, [])
+
+    def test_slow_query_plan(self):
+        with patch("src.database.db.config.slow_query_ms", 0), \
+                self.assertLogs("src.database.db", "WARNING") as logs:
+            self.run_queries(1)
+        self.assertIn("Slow query", logs.output[0])
+        self.assertIn("plan:", logs.output[0])
+        self.assertIn("contacts", logs.output[0].split("plan:")[1])
+
+    def test_slow_executemany_logs_parameter_shape(self):
+        with patch("src.database.db.config.slow_query_ms", 0), \
+                self.assertLogs("src.database.db", "WARNING") as logs, self.engine.begin() as conn:
+            conn.execute(text("INSERT INTO contacts (user_id) VALUES (:user_id)"),
+                         [{"user_id": user_id} for user_id in range(1000)])
+        self.assertIn("parameters: 1000 sets of (int,)", logs.output[0])
+        self.assertLess(len(logs.output[0]), 1500)
+
+    def test_slow_query_hides_parameter_values(self):
+        with patch("src.database.db.config.slow_query_ms", 0), \
+                self.assertLogs("src.database.db", "WARNING") as logs, self.engine.begin() as conn:
+            conn.execute(text("SELECT id FROM contacts WHERE user_id = :user_id AND :token != ''"),
+                         {"user_id": 41, "token": "secret-refresh-token"})
+        self.assertIn("parameters: (int, str)", logs.output[0])
+        self.assertNotIn("secret-refresh-token", logs.output[0])
+        self.assertNotIn("41", logs.output[0].split("plan:")[0])
+
+    def test_slow_write_has_no_plan(self):
+        with patch("src.database.db.config.slow_query_ms", 0), \
+                self.assertLogs("src.database.db", "WARNING") as logs, self.engine.begin() as conn:
+            conn.execute(text("INSERT INTO contacts (user_id) VALUES (1)"))
+        self.assertNotIn("plan:", logs.output[0])
+
+
+class TestQueryBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/items", dependencies=[Depends(query_budget(1))])
+        async def items(count: int = 1):
+            with self.engine.connect() as conn:
+                for _ in range(count):
+                    conn.execute(text("SELECT 1"))
+            return {"count": count}
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_within_budget(self):
+        with patch("src.services.query_budget.config.query_budget_strict", True):
+            response = self.client.get("/items", params={"count": 1})
+        self.assertEqual(response.status_code, 200)
+
+    def test_over_budget_strict(self):
+        with patch("src.services.query_budget.config.query_budget_strict", True):
+            with self.assertRaises(QueryBudgetExceeded) as raised:
+                self.client.get("/items", params={"count": 3})
+        self.assertIn("GET /items ran 3 SQL statements, budget is 1", str(raised.exception))
+        self.assertIn("3x SELECT 1", str(raised.exception))
+
+    def test_over_budget_logged(self):
+        with patch("src.services.query_budget.config.query_budget_strict", False), \
+                self.assertLogs("src.services.query_budget", "WARNING") as logs:
+            response = self.client.get("/items", params={"count": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("budget is 1", logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from redis.exceptions import ConnectionError
+
+from src.services.ratelimit import RateLimiter, TokenBucket, parse_limit
+
+try:
+    import fakeredis
+    import lupa  # noqa: F401  fakeredis needs it to run Lua scripts
+except ImportError:  # pragma: no cover
+    fakeredis = None
+
+
+class TestParseLimit(unittest.TestCase):
+
+    def test_formats(self):
+        self.assertEqual(parse_limit("5/minute"), (5, 60))
+        self.assertEqual(parse_limit("3 / 10 minutes"), (3, 600))
+        self.assertEqual(parse_limit("100/second"), (100, 1))
+        with self.assertRaises(ValueError):
+            parse_limit("5 per minute")
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_refill(self):
+        bucket = TokenBucket()
+        with patch("src.services.ratelimit.time.monotonic", return_value=100):
+            self.assertEqual([bucket.hit("a", 2, 60)[0] for _ in range(3)], [True, True, False])
+            self.assertEqual(bucket.hit("a", 2, 60)[2], 30)
+            self.assertTrue(bucket.hit("b", 2, 60)[0])
+        with patch("src.services.ratelimit.time.monotonic", return_value=130):
+            self.assertTrue(bucket.hit("a", 2, 60)[0])
+            self.assertFalse(bucket.hit("a", 2, 60)[0])
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis[lua] is not installed")
+class TestRedisSlidingWindow(unittest.IsolatedAsyncioTestCase):
+
+    async def test_window(self):
+        limiter = RateLimiter({"login": "3/minute"}, redis=fakeredis.FakeAsyncRedis())
+        results = [await limiter.hit("login", "10.0.0.1") for _ in range(4)]
+        self.assertEqual([(allowed, remaining) for allowed, remaining, _ in results],
+                         [(True, 2), (True, 1), (True, 0), (False, 0)])
+        self.assertTrue(0 < results[-1][2] <= 60)
+        self.assertTrue((await limiter.hit("login", "10.0.0.2"))[0])
+        self.assertEqual(len(limiter.fallback._buckets), 0)
+
+
+class TestFallback(unittest.IsolatedAsyncioTestCase):
+
+    async def test_redis_error_uses_local_buckets(self):
+        script = AsyncMock(side_effect=ConnectionError("down"))
+        redis = MagicMock()
+        redis.register_script.return_value = script
+        limiter = RateLimiter({"login": "2/minute"}, redis=redis)
+        self.assertEqual([(await limiter.hit("login", "ip"))[0] for _ in range(3)], [True, True, False])
+        script.assert_awaited_once()
+        limiter.reset()
+        await limiter.hit("login", "ip")
+        self.assertEqual(script.await_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from redis.exceptions import RedisError
+
+from src.services.read_routing import RecentWrites
+
+
+class TestRecentWrites(unittest.IsolatedAsyncioTestCase):
+
+    async def test_window(self):
+        writes = RecentWrites(5)
+        with patch("src.services.cache.time.monotonic", return_value=100.0):
+            await writes.mark(1)
+            self.assertTrue(await writes.recent(1))
+            self.assertFalse(await writes.recent(2))
+        with patch("src.services.cache.time.monotonic", return_value=105.1):
+            self.assertFalse(await writes.recent(1))
+
+    async def test_write_seen_by_other_worker(self):
+        redis = AsyncMock()
+        writer, reader = RecentWrites(5), RecentWrites(5)
+        writer.redis = reader.redis = redis
+        await writer.mark(7)
+        redis.set.assert_awaited_once_with("wrote:7", 1, px=5000)
+        redis.exists.return_value = 1
+        self.assertTrue(await reader.recent(7))
+        redis.exists.assert_awaited_once_with("wrote:7")
+
+    async def test_redis_down(self):
+        writes = RecentWrites(5)
+        writes.redis = AsyncMock()
+        writes.redis.set.side_effect = writes.redis.exists.side_effect = RedisError()
+        with patch("src.services.read_routing.time.monotonic", return_value=100.0), \
+                self.assertLogs("src.services.read_routing", "WARNING"):
+            await writes.mark(1)
+            self.assertTrue(await writes.recent(1))
+            self.assertFalse(await writes.recent(2))
+            self.assertFalse(await writes.recent(3))
+        # Redis is skipped while it is marked down
+        writes.redis.set.assert_awaited_once()
+        writes.redis.exists.assert_not_awaited()
+        with patch("src.services.read_routing.time.monotonic", return_value=105.0), \
+                self.assertLogs("src.services.read_routing", "WARNING"):
+            self.assertFalse(await writes.recent(2))
+        writes.redis.exists.assert_awaited_once_with("wrote:2")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,79 +1,143 @@
 import unittest
-from unittest.mock import MagicMock
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.models import Contact, User
-from src.schemas import ContactCreate
+from src.database.models import Contact, User, normalize_phone
+from src.schemas import ContactCreate, ContactSort
 from src.repository.contacts import (
     get_contacts,
     get_contact_by_id,
     create_contact,
     update_contact,
     delete_contact,
+    encode_cursor,
+    contact_columns,
+    CONTACT_COLUMNS,
+    SORT_KEYS,
+    decode_cursor,
+    birthday_window,
 )
 
 
 class TestNotes(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = AsyncMock(spec=AsyncSession)
+        self.session.add = MagicMock()
         self.user = User(id=1)
+        self.body = ContactCreate(first_name="John", last_name="Doe", email="john@example.com",
+                                  phone_number="+380501234567", birthday=date(1990, 5, 17))
+
+    def mock_result(self, value):
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = value
+        result.mappings.return_value.all.return_value = value
+        result.scalar_one_or_none.return_value = value
+        self.session.execute.return_value = result
 
     async def test_get_contacts(self):
-        contacts = [Contact(), Contact(), Contact()]
-        self.session.query().filter().all.return_value = contacts
+        contacts = [{"id": 1}, {"id": 2}, {"id": 3}]
+        self.mock_result(contacts)
         result = await get_contacts(user=self.user, db=self.session)
         self.assertEqual(result, contacts)
 
+    async def test_get_contacts_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            await get_contacts(user=self.user, db=self.session, after="not-a-cursor")
+        self.session.execute.assert_not_awaited()
+
+    def test_cursor_round_trip(self):
+        contact = Contact(id=7, last_name="Doe", first_name="John", birthday=date(1990, 5, 17))
+        cursor = encode_cursor(contact, ContactSort.birthday)
+        self.assertEqual(decode_cursor(cursor, ContactSort.birthday), [date(1990, 5, 17), 7])
+        with self.assertRaises(ValueError):
+            decode_cursor(cursor, ContactSort.name)
+
+    def test_cursor_from_row(self):
+        row = {"id": 7, "last_name": "Doe", "first_name": "John", "birthday": date(1990, 5, 17)}
+        self.assertEqual(encode_cursor(row, ContactSort.name),
+                         encode_cursor(Contact(**row), ContactSort.name))
+
+    def test_contact_columns(self):
+        self.assertEqual(contact_columns(None), list(CONTACT_COLUMNS))
+        columns = contact_columns(("id", "phone_number"), *SORT_KEYS[ContactSort.name])
+        self.assertEqual([column.key for column in columns], ["id", "first_name", "last_name", "phone_number"])
+
+    def test_birthday_window_crosses_new_year(self):
+        self.assertEqual(birthday_window(date(2023, 12, 28), 7), (1228, 104))
+
+    def test_birthday_window_feb_29(self):
+        self.assertEqual(birthday_window(date(2023, 2, 21), 7), (221, 229))
+        self.assertEqual(birthday_window(date(2024, 2, 21), 7), (221, 228))
+        self.assertEqual(birthday_window(date(2023, 2, 25), 7), (225, 304))
+
+    def test_birthday_key_follows_birthday(self):
+        contact = Contact(birthday=date(2000, 2, 29))
+        self.assertEqual(contact.birthday_key, 229)
+        contact.birthday = date(1990, 12, 1)
+        self.assertEqual(contact.birthday_key, 1201)
+
+    def test_normalize_phone(self):
+        self.assertEqual(normalize_phone("+38 (050) 111-22-33"), "+380501112233")
+        self.assertEqual(normalize_phone("050 111 22 33"), "+380501112233")
+        self.assertEqual(normalize_phone("00380501112233"), "+380501112233")
+        self.assertEqual(normalize_phone("0 20 7946 0958", country_code="44"), "+442079460958")
+        self.assertIsNone(normalize_phone("112"))
+        self.assertIsNone(normalize_phone("+1234567890123456"))
+        self.assertIsNone(normalize_phone(None))
+
+    def test_phone_e164_follows_phone_number(self):
+        contact = Contact(phone_number="050 111 22 33")
+        self.assertEqual(contact.phone_e164, "+380501112233")
+        contact.phone_number = "n/a"
+        self.assertIsNone(contact.phone_e164)
+
     async def test_get_contact_by_id_found(self):
         contact = Contact()
-        self.session.query().filter().first.return_value = contact
+        self.mock_result(contact)
         result = await get_contact_by_id(user=self.user, db=self.session, contact_id=1)
         self.assertEqual(result, contact)
 
     async def test_get_contact_by_id_not_found(self):
-        self.session.query().filter().first.return_value = None
+        self.mock_result(None)
         result = await get_contact_by_id(user=self.user, db=self.session, contact_id=1)
         self.assertIsNone(result)
 
     async def test_create_contact(self):
-        body = ContactCreate(title="test", description="test contact")
-        result = await create_contact(body=body, user=self.user, db=self.session)
-        self.assertEqual(result.title, body.title)
-        self.assertEqual(result.description, body.description)
-        self.assertEqual(result.user, self.user)
+        result = await create_contact(body=self.body, user=self.user, db=self.session)
+        self.assertEqual(result.first_name, self.body.first_name)
+        self.assertEqual(result.email, self.body.email)
+        self.assertEqual(result.user_id, self.user.id)
+        self.session.commit.assert_awaited_once()
 
     async def test_update_contact_found(self):
         contact_id = 1
-        body = ContactCreate(title="updated", description="updated contact")
-        contact = Contact(id=contact_id, user=self.user)
-        self.session.query().filter().first.return_value = contact
-        self.session.commit.return_value = None
-        result = await update_contact(user=self.user, db=self.session, contact_id=contact_id, contact=body)
-        self.assertEqual(result.title, body.title)
-        self.assertEqual(result.description, body.description)
+        contact = Contact(id=contact_id, user_id=self.user.id)
+        self.mock_result(contact)
+        result = await update_contact(user=self.user, db=self.session, contact_id=contact_id, contact=self.body)
+        self.assertEqual(result.first_name, self.body.first_name)
+        self.assertEqual(result.birthday, self.body.birthday)
 
     async def test_update_contact_not_found(self):
         contact_id = 1
-        body = ContactCreate(title="updated", description="updated contact")
-        self.session.query().filter().first.return_value = None
-        self.session.commit.return_value = None
-        result = await update_contact(user=self.user, db=self.session, contact_id=contact_id, contact=body)
+        self.mock_result(None)
+        result = await update_contact(user=self.user, db=self.session, contact_id=contact_id, contact=self.body)
         self.assertIsNone(result)
+        self.session.commit.assert_not_awaited()
 
     async def test_delete_contact_found(self):
         contact_id = 1
-        contact = Contact(id=contact_id, user=self.user)
-        self.session.query().filter().first.return_value = contact
-        self.session.commit.return_value = None
+        contact = Contact(id=contact_id, user_id=self.user.id)
+        self.mock_result(contact)
         result = await delete_contact(user=self.user, db=self.session, contact_id=contact_id)
         self.assertEqual(result, contact)
+        self.session.delete.assert_awaited_once_with(contact)
 
     async def test_delete_contact_not_found(self):
         contact_id = 1
-        self.session.query().filter().first.return_value = None
-        self.session.commit.return_value = None
+        self.mock_result(None)
         result = await delete_contact(user=self.user, db=self.session, contact_id=contact_id)
         self.assertIsNone(result)
 
@@ -0,0 +1,35 @@
+import unittest
+from datetime import date
+
+from src.services.serialization import CONTACT_FIELDS, contact_response, contacts_response, parse_fields, row_adapter
+
+
+class TestSparseFieldsets(unittest.TestCase):
+
+    def test_parse_fields(self):
+        self.assertIsNone(parse_fields(None))
+        self.assertEqual(parse_fields("phone_number, first_name,first_name"), ("id", "first_name", "phone_number"))
+        self.assertEqual(parse_fields(",".join(CONTACT_FIELDS)), CONTACT_FIELDS)
+
+    def test_parse_fields_invalid(self):
+        with self.assertRaisesRegex(ValueError, "Unknown fields: password, user_id"):
+            parse_fields("first_name,user_id,password")
+        with self.assertRaisesRegex(ValueError, "No fields"):
+            parse_fields(" , ")
+
+    def test_adapter_is_cached(self):
+        self.assertIs(row_adapter(("id", "email")), row_adapter(("id", "email")))
+        self.assertIsNot(row_adapter(("id", "email")), row_adapter(("id", "email"), many=False))
+
+    def test_responses_are_trimmed(self):
+        row = {"id": 1, "first_name": "John", "last_name": "Doe", "email": "john@example.com",
+               "phone_number": "+380501112233", "birthday": date(1990, 5, 17), "additional_data": None,
+               "version": 3}
+        self.assertEqual(contacts_response([row]).body,
+                         b'[{"id":1,"first_name":"John","last_name":"Doe","email":"john@example.com",'
+                         b'"phone_number":"+380501112233","birthday":"1990-05-17","additional_data":null}]')
+        self.assertEqual(contact_response(row, ("id", "birthday")).body, b'{"id":1,"birthday":"1990-05-17"}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,20 @@
+import unittest
+
+from src.services.storage import AvatarStorage, LocalAvatarStorage
+
+
+class TestAvatarStorage(unittest.TestCase):
+
+    def test_backend_without_save_fails_on_creation(self):
+        class Incomplete(AvatarStorage):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_local_storage_is_complete(self):
+        self.assertFalse(LocalAvatarStorage.__abstractmethods__)
+
+
+if __name__ == '__main__':
+    unittest.main()